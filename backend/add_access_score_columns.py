@@ -0,0 +1,48 @@
+"""
+Migration script to add access score columns for hot customer refresh
+(customer_links.access_score, customer_links.access_scored_at,
+customers.hot_refreshed_at)
+Run this once on your production server: python add_access_score_columns.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+COLUMNS = [
+    ("customer_links", "access_score", "FLOAT NOT NULL DEFAULT 0"),
+    ("customer_links", "access_scored_at", "DATETIME"),
+    ("customers", "hot_refreshed_at", "DATETIME"),
+]
+
+
+def add_columns():
+    """Add any missing access score columns"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for table, column, column_type in COLUMNS:
+            # Check if table and column already exist
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if not columns:
+                print(f"- Table '{table}' does not exist yet (created on next startup)")
+            elif column in columns:
+                print(f"✓ Column '{table}.{column}' already exists")
+            else:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                print(f"✓ Successfully added '{column}' column to {table} table")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding access score columns...")
+    add_columns()
+    print("\nMigration complete! You can now restart your backend service.")
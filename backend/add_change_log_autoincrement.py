@@ -0,0 +1,69 @@
+"""
+Migration script to rebuild customer_changes with AUTOINCREMENT, so change
+IDs (the /changes cursor) are never reused, even after retention has
+emptied the table. Existing rows and indexes are kept.
+Run this once on your production server: python add_change_log_autoincrement.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+TABLE = "customer_changes"
+
+
+def rebuild_table():
+    """Recreate customer_changes with an AUTOINCREMENT primary key"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE,))
+        row = cursor.fetchone()
+        if row is None:
+            print(f"- Table '{TABLE}' does not exist yet (created on next startup)")
+            return
+        if "AUTOINCREMENT" in row[0].upper():
+            print(f"✓ Table '{TABLE}' already uses AUTOINCREMENT")
+            return
+
+        cursor.execute(f"PRAGMA table_info({TABLE})")
+        columns = cursor.fetchall()
+        definitions = ["id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT"]
+        for _, name, column_type, not_null, default, _ in columns:
+            if name == "id":
+                continue
+            definition = f"{name} {column_type}"
+            if not_null:
+                definition += " NOT NULL"
+            if default is not None:
+                definition += f" DEFAULT {default}"
+            definitions.append(definition)
+
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (TABLE,)
+        )
+        index_sqls = [index[0] for index in cursor.fetchall()]
+
+        column_list = ", ".join(column[1] for column in columns)
+        cursor.execute(f"CREATE TABLE {TABLE}_new ({', '.join(definitions)})")
+        # Copying explicit IDs also sets the table's sqlite_sequence to the highest one
+        cursor.execute(f"INSERT INTO {TABLE}_new ({column_list}) SELECT {column_list} FROM {TABLE}")
+        cursor.execute(f"DROP TABLE {TABLE}")
+        cursor.execute(f"ALTER TABLE {TABLE}_new RENAME TO {TABLE}")
+        for index_sql in index_sqls:
+            cursor.execute(index_sql)
+        conn.commit()
+        print(f"✓ Successfully rebuilt {TABLE} with AUTOINCREMENT")
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding AUTOINCREMENT to the change log...")
+    rebuild_table()
+    print("\nMigration complete! You can now restart your backend service.")
@@ -0,0 +1,54 @@
+"""
+Migration script to promote frequently used customer fields to columns
+(customers.company_name, customers.loyalty_points, customers.loyalty_text)
+and backfill them from the stored upstream JSON (SQLite JSON1)
+Run this once on your production server: python add_customer_detail_columns.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+COLUMNS = [
+    ("company_name", "VARCHAR"),
+    ("loyalty_points", "FLOAT"),
+    ("loyalty_text", "VARCHAR"),
+]
+
+
+def add_columns():
+    """Add any missing customer detail columns and fill them from customers.data"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Check if table and columns already exist
+        cursor.execute("PRAGMA table_info(customers)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            print("- Table 'customers' does not exist yet (created on next startup)")
+            return
+
+        for column, column_type in COLUMNS:
+            if column in columns:
+                print(f"✓ Column 'customers.{column}' already exists")
+            else:
+                cursor.execute(f"ALTER TABLE customers ADD COLUMN {column} {column_type}")
+                print(f"✓ Successfully added '{column}' column to customers table")
+
+        assignments = ", ".join(f"{column} = json_extract(data, '$.{column}')" for column, _ in COLUMNS)
+        cursor.execute(f"UPDATE customers SET {assignments} WHERE data IS NOT NULL AND json_valid(data)")
+        print(f"✓ Backfilled {cursor.rowcount} customers from stored data")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding customer detail columns...")
+    add_columns()
+    print("\nMigration complete! You can now restart your backend service.")
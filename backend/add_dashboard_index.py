@@ -0,0 +1,39 @@
+"""
+Migration script to add the customers (tenant_id, outstanding_balance) index
+used for the admin dashboard's top debtors. The customer_stats table is
+created on next startup.
+Run this once on your production server: python add_dashboard_index.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+
+def add_index():
+    """Create the top debtors index if it is missing"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'customers'")
+        if not cursor.fetchone():
+            print("- Table 'customers' does not exist yet (created on next startup)")
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_customers_tenant_outstanding "
+            "ON customers (tenant_id, outstanding_balance)"
+        )
+        conn.commit()
+        print("✓ Index 'ix_customers_tenant_outstanding' is in place")
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding dashboard index...")
+    add_index()
+    print("\nMigration complete! You can now restart your backend service.")
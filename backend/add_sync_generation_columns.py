@@ -0,0 +1,63 @@
+"""
+Migration script to add mark-and-sweep sync columns
+(customers.sync_generation, customers.deleted_at,
+customer_links.customer_missing_at, sync_jobs.generation, sync_jobs.removed_count,
+sync_jobs.resource)
+Run this once on your production server: python add_sync_generation_columns.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+COLUMNS = [
+    ("customers", "sync_generation", "INTEGER"),
+    ("customers", "deleted_at", "DATETIME"),
+    ("customer_links", "customer_missing_at", "DATETIME"),
+    ("sync_jobs", "generation", "INTEGER"),
+    ("sync_jobs", "removed_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("sync_jobs", "resource", "VARCHAR NOT NULL DEFAULT 'customers'"),
+]
+
+INDEXES = [
+    ("ix_customers_sync_generation", "customers", "sync_generation"),
+    ("ix_customers_deleted_at", "customers", "deleted_at"),
+]
+
+
+def add_columns():
+    """Add any missing sync generation / tombstone columns"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for table, column, column_type in COLUMNS:
+            # Check if table and column already exist
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if not columns:
+                print(f"- Table '{table}' does not exist yet (created on next startup)")
+            elif column in columns:
+                print(f"✓ Column '{table}.{column}' already exists")
+            else:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                print(f"✓ Successfully added '{column}' column to {table} table")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        for name, table, column in INDEXES:
+            if table in tables:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding mark-and-sweep sync columns...")
+    add_columns()
+    print("\nMigration complete! You can now restart your backend service.")
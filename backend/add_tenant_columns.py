@@ -0,0 +1,65 @@
+"""
+Migration script to add the tenant_id column for multi-shop tenancy
+(customers, customer_links, sync_jobs, customer_changes, balance_history
+and the ewity_* mirror tables). Existing rows belong to the 'default' tenant.
+The tenants table itself is created on next startup.
+Run this once on your production server: python add_tenant_columns.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+TABLES = [
+    "customers",
+    "customer_links",
+    "sync_jobs",
+    "customer_changes",
+    "balance_history",
+    "ewity_users",
+    "ewity_employees",
+    "ewity_locations",
+    "ewity_expenses",
+    "ewity_tags",
+]
+
+# balance_history is always read per customer, so it has no tenant index
+INDEXED_TABLES = [table for table in TABLES if table != "balance_history"]
+
+
+def add_columns():
+    """Add any missing tenant_id columns"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for table in TABLES:
+            # Check if table and column already exist
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if not columns:
+                print(f"- Table '{table}' does not exist yet (created on next startup)")
+            elif "tenant_id" in columns:
+                print(f"✓ Column '{table}.tenant_id' already exists")
+            else:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN tenant_id VARCHAR NOT NULL DEFAULT 'default'")
+                print(f"✓ Successfully added 'tenant_id' column to {table} table")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        for table in INDEXED_TABLES:
+            if table in tables:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_tenant_id ON {table} (tenant_id)")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding tenant columns...")
+    add_columns()
+    print("\nMigration complete! You can now restart your backend service.")
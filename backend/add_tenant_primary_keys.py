@@ -0,0 +1,104 @@
+"""
+Migration script to key customers and the ewity_* mirror tables by
+(tenant_id, id) instead of the Ewity id alone, since Ewity ids are only
+unique within a shop. SQLite cannot change a primary key in place, so each
+table is rebuilt and its indexes recreated. Also replaces the per-customer
+indexes on customer_changes and balance_history with tenant-scoped ones.
+Run add_tenant_columns.py first.
+Run this once on your production server: python add_tenant_primary_keys.py
+"""
+import sqlite3
+
+# Path to your database file (adjust if needed)
+DB_PATH = "blvq.db"
+
+TABLES = [
+    "customers",
+    "ewity_users",
+    "ewity_employees",
+    "ewity_locations",
+    "ewity_expenses",
+    "ewity_tags",
+]
+
+OLD_PRIMARY_KEY = "PRIMARY KEY (id)"
+NEW_PRIMARY_KEY = "PRIMARY KEY (tenant_id, id)"
+
+# (old index, new index, table, columns)
+REPLACED_INDEXES = [
+    ("ix_customer_changes_customer_id", "ix_customer_changes_tenant_customer",
+     "customer_changes", "tenant_id, customer_id"),
+    ("ix_balance_history_customer_time", "ix_balance_history_tenant_customer_time",
+     "balance_history", "tenant_id, customer_id, recorded_at"),
+]
+
+
+def rebuild_table(cursor, table):
+    """Recreate a table with the composite primary key, keeping its rows and indexes"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    row = cursor.fetchone()
+    if row is None:
+        print(f"- Table '{table}' does not exist yet (created on next startup)")
+        return
+    create_sql = row[0]
+    if NEW_PRIMARY_KEY in create_sql:
+        print(f"✓ Table '{table}' already keyed by (tenant_id, id)")
+        return
+
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [column[1] for column in cursor.fetchall()]
+    if "tenant_id" not in columns:
+        print(f"✗ Table '{table}' has no tenant_id column, run add_tenant_columns.py first")
+        return
+    if OLD_PRIMARY_KEY not in create_sql:
+        print(f"✗ Table '{table}' has an unexpected primary key, skipped")
+        return
+
+    # The tenant_id index is covered by the new primary key
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL AND name != ?",
+        (table, f"ix_{table}_tenant_id")
+    )
+    index_sqls = [index[0] for index in cursor.fetchall()]
+
+    new_sql = create_sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE {table}_new", 1)
+    new_sql = new_sql.replace(OLD_PRIMARY_KEY, NEW_PRIMARY_KEY)
+    column_list = ", ".join(columns)
+    cursor.execute(new_sql)
+    cursor.execute(f"INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for index_sql in index_sqls:
+        cursor.execute(index_sql)
+    print(f"✓ Successfully rebuilt {table} with primary key (tenant_id, id)")
+
+
+def migrate():
+    """Rebuild the mirrored tables and replace the per-customer indexes"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for table in TABLES:
+            rebuild_table(cursor, table)
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        for old_index, new_index, table, columns in REPLACED_INDEXES:
+            if table not in tables:
+                continue
+            cursor.execute(f"DROP INDEX IF EXISTS {old_index}")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {new_index} ON {table} ({columns})")
+            print(f"✓ Index '{new_index}' is in place")
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"✗ Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("Adding tenant primary keys...")
+    migrate()
+    print("\nMigration complete! You can now restart your backend service.")
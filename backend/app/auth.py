@@ -1,8 +1,12 @@
-"""Authentication and authorization"""
+"""Authentication and authorization
+
+passlib/argon2 and jose are imported on first use (login, admin
+requests), not when the app is imported.
+"""
+import secrets
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -13,25 +17,32 @@ from .schemas import TokenData
 
 settings = get_settings()
 
-# Password hashing (using argon2 - more modern and secure)
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 # Bearer token scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+
+@lru_cache()
+def pwd_context():
+    """Password hashing context (using argon2 - more modern and secure)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["argon2"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash password"""
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -45,6 +56,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> Optional[TokenData]:
     """Decode and validate JWT token"""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
@@ -87,3 +100,21 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
             detail="Not enough permissions"
         )
     return current_user
+
+
+async def verify_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> None:
+    """Allow /metrics with the static METRICS_TOKEN (for scrapers) or an admin token"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if settings.metrics_token and secrets.compare_digest(
+        credentials.credentials.encode(), settings.metrics_token.encode()
+    ):
+        return
+    await get_current_admin_user(await get_current_user(credentials, db))
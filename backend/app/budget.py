@@ -0,0 +1,140 @@
+"""Upstream Ewity call accounting and quota guard
+
+Every Ewity request is attributed to an origin: the route template of the
+current request, or an explicit job name set with `upstream_origin()`.
+Rolling per-minute and per-day totals are kept in one-minute buckets; the
+per-minute figure is a sliding 60 seconds (the current bucket plus the
+unelapsed share of the previous one), so bursts straddling a minute
+boundary cannot spend twice the budget. The balance routes degrade to local data once usage crosses
+`ewity_budget_degrade_ratio` of either budget, and EwityClient refuses calls
+outright once a budget is exhausted. Totals are per process.
+"""
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Optional, Tuple
+from fastapi import Request
+from .config import get_settings
+
+settings = get_settings()
+
+_origin: ContextVar[Optional[str]] = ContextVar("upstream_origin", default=None)
+
+
+class UpstreamBudgetExceeded(Exception):
+    """Raised instead of calling Ewity when the call budget is used up"""
+
+
+@contextmanager
+def upstream_origin(name: str):
+    """Attribute Ewity calls made inside the block to a named job"""
+    token = _origin.set(name)
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+async def track_upstream_origin(request: Request) -> None:
+    """App-wide dependency: attribute this request's Ewity calls to its route"""
+    route = request.scope.get("route")
+    _origin.set(f"{request.method} {getattr(route, 'path', request.url.path)}")
+
+
+def current_origin() -> str:
+    return _origin.get() or "unknown"
+
+
+class UpstreamBudget:
+    """Rolling per-origin Ewity call counts in one-minute buckets (24h window)
+
+    A running total of the calls in the window is kept as buckets are
+    added and evicted, so the per-request budget checks do not have to sum
+    a day of buckets.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._buckets: Deque[Tuple[int, Counter]] = deque()
+        self._day_total = 0
+
+    def _evict(self, minute: int) -> None:
+        while self._buckets and self._buckets[0][0] <= minute - 1440:
+            self._day_total -= sum(self._buckets.popleft()[1].values())
+
+    def _bucket(self, minute: int) -> Counter:
+        if not self._buckets or self._buckets[-1][0] != minute:
+            self._buckets.append((minute, Counter()))
+            self._evict(minute)
+        return self._buckets[-1][1]
+
+    def record(self, origin: str) -> None:
+        self._bucket(int(self._clock() // 60))[origin] += 1
+        self._day_total += 1
+
+    def usage(self, window_minutes: int) -> Counter:
+        """Calls per origin over the last `window_minutes` minutes"""
+        cutoff = int(self._clock() // 60) - window_minutes
+        totals: Counter = Counter()
+        for minute, counts in reversed(self._buckets):
+            if minute <= cutoff:
+                break
+            totals.update(counts)
+        return totals
+
+    def last_60_seconds(self) -> Counter:
+        """Estimated calls per origin over the last 60 seconds
+
+        The current bucket counts in full and the previous one in proportion
+        to how much of it still falls inside the window.
+        """
+        now = self._clock()
+        minute = int(now // 60)
+        previous_weight = 1 - (now % 60) / 60
+        totals: Counter = Counter()
+        for bucket_minute, counts in reversed(self._buckets):
+            if bucket_minute == minute:
+                totals.update(counts)
+            elif bucket_minute == minute - 1:
+                for origin, count in counts.items():
+                    totals[origin] += count * previous_weight
+            else:
+                break
+        return totals
+
+    def _ratios(self) -> Tuple[float, float]:
+        self._evict(int(self._clock() // 60))
+        minute = sum(self.last_60_seconds().values()) / max(settings.ewity_budget_per_minute, 1)
+        day = self._day_total / max(settings.ewity_budget_per_day, 1)
+        return minute, day
+
+    def exhausted(self) -> bool:
+        """True when either budget is fully used"""
+        return max(self._ratios()) >= 1.0
+
+    def should_degrade(self) -> bool:
+        """True when routes should prefer local data to save upstream calls"""
+        return max(self._ratios()) >= settings.ewity_budget_degrade_ratio
+
+    def summary(self) -> Dict:
+        minute, day = self.last_60_seconds(), self.usage(1440)
+        return {
+            "minute": {
+                "total": round(sum(minute.values())),
+                "budget": settings.ewity_budget_per_minute,
+                "by_origin": {origin: round(count, 1) for origin, count in minute.most_common()},
+            },
+            "day": {
+                "total": sum(day.values()),
+                "budget": settings.ewity_budget_per_day,
+                "by_origin": dict(day.most_common()),
+            },
+            "degrade_ratio": settings.ewity_budget_degrade_ratio,
+            "degraded": self.should_degrade(),
+            "exhausted": self.exhausted(),
+        }
+
+
+# Global budget instance
+upstream_budget = UpstreamBudget()
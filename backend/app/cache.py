@@ -2,6 +2,7 @@
 from datetime import datetime, timedelta
 from typing import Optional, Any, Dict
 from .config import get_settings
+from .metrics import CACHE_LOOKUPS
 
 settings = get_settings()
 
@@ -18,10 +19,12 @@ class SimpleCache:
         if key in self._cache:
             value, expiry = self._cache[key]
             if datetime.utcnow() < expiry:
+                CACHE_LOOKUPS.labels("hit").inc()
                 return value
             else:
                 # Remove expired entry
                 del self._cache[key]
+        CACHE_LOOKUPS.labels("miss").inc()
         return None
 
     def set(self, key: str, value: Any) -> None:
@@ -7,6 +7,23 @@ class Settings(BaseSettings):
     # Ewity API
     ewity_api_token: str  # Required - must be set in .env
     ewity_api_base_url: str = "https://api.ewitypos.com/v1"
+    ewity_transport_mode: str = "live"  # live, record or replay
+    ewity_cassette_path: str = "ewity_cassette.ndjson.gz"
+    ewity_replay_timing: str = "original"  # original (recorded pacing and latency), latency or none
+
+    # Ewity call budget (balance routes fall back to local data above the ratio)
+    ewity_budget_per_minute: int = 120
+    ewity_budget_per_day: int = 50000
+    ewity_budget_degrade_ratio: float = 0.8
+
+    # Hedged Ewity GETs: send a duplicate when a request is slower than the
+    # percentile of recent latency, for at most hedge_ratio of requests
+    ewity_hedge_enabled: bool = False
+    ewity_hedge_percentile: float = 95.0
+    ewity_hedge_min_delay_ms: float = 50.0
+    ewity_hedge_min_samples: int = 20
+    ewity_hedge_window: int = 200
+    ewity_hedge_ratio: float = 0.05
 
     # Database
     database_url: str = "sqlite:///./blvq.db"
@@ -23,8 +40,64 @@ class Settings(BaseSettings):
     # CORS
     frontend_url: str = "https://blvq.crawlingsloth.cloud"
 
+    # Snapshot to load on first start instead of a full sync (see app/snapshot.py)
+    snapshot_import_path: str = ""
+
+    # Sync jobs
+    sync_page_retries: int = 3
+    sync_retry_backoff_seconds: float = 1.0
+    sync_page_concurrency: int = 4  # Pages fetched in parallel per sync (committed in order)
+    sync_max_concurrent_fetches: int = 4  # Sync page fetches across all tenants, shared round-robin
+    sync_schedule_check_seconds: int = 60  # How often tenant sync schedules are checked
+    customer_tombstone_retention_days: int = 30  # Purge customers removed upstream after this long
+    change_log_retention_days: int = 90  # Balance change log entries older than this are pruned
+    balance_history_raw_days: int = 30  # Older balance history is downsampled to one point per day
+    balance_history_retention_days: int = 730  # Older points are dropped (latest one per customer kept)
+    dashboard_top_debtors: int = 10  # Customers listed by GET /api/admin/dashboard
+
+    # Hot customer refresh (pages of often-scanned customers are re-fetched ahead of requests)
+    hot_refresh_enabled: bool = True
+    hot_refresh_interval_seconds: int = 30  # How often due customers are looked for
+    hot_refresh_calls_per_minute: int = 20  # Ewity calls the refresher may use, per tenant
+    hot_refresh_target_seconds: int = 3600  # Refresh interval for a score of 1 (scaled by 1/score)
+    hot_refresh_min_seconds: int = 60  # Never refresh a customer more often than this
+    hot_refresh_min_score: float = 0.5  # Colder customers are left to the full sync
+    access_score_half_life_hours: float = 24.0
+    balance_local_fresh_seconds: int = 120  # Serve rows the hot refresher updated this recently without calling Ewity
+
     # Cache
     cache_ttl_seconds: int = 300  # 5 minutes
+    balance_max_age_seconds: int = 15  # Cache-Control max-age for live balance responses
+    balance_batch_max_uuids: int = 50
+    balance_batch_scan_pages: int = 3  # Uncached Ewity pages one batch may scan per tenant
+
+    # Rate limiting / load shedding (public customer endpoints)
+    rate_limit_enabled: bool = True
+    rate_limit_ip_per_minute: int = 60
+    rate_limit_ip_burst: int = 20
+    rate_limit_uuid_per_minute: int = 30
+    rate_limit_uuid_burst: int = 10
+    rate_limit_max_tracked_keys: int = 10000
+    rate_limit_trust_proxy_headers: bool = True  # Use CF-Connecting-IP / X-Forwarded-For...
+    rate_limit_trusted_proxies: str = "127.0.0.1,::1"  # ...only from these peers (IPs/CIDRs, e.g. cloudflared)
+    max_in_flight_requests: int = 50
+
+    # Metrics
+    metrics_enabled: bool = False
+    metrics_token: str = ""  # Bearer token for scrapers; admin tokens are always accepted
+
+    # Logging / tracing
+    log_level: str = "INFO"
+    tracing_sample_rate: float = 0.1  # Fraction of requests traced (Server-Timing + span logs)
+
+    # Admin per-request profiling (X-Profile: 1 with an admin token)
+    profiling_enabled: bool = False
+    profile_output_dir: str = "profiles"
+    profile_interval_seconds: float = 0.001
+
+    # Live balance updates (Server-Sent Events)
+    sse_heartbeat_seconds: int = 25
+    sse_max_connections: int = 1000
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,158 @@
+"""Admin dashboard aggregates, maintained incrementally
+
+One `customer_stats` row per tenant holds the live customer count, total
+outstanding (integer cents), customers over their credit limit and linked
+customers. Sync applies per-page deltas to it with a single UPDATE in the
+page's own transaction (new, changed, resurrected and tombstoned rows),
+so the dashboard never scans `customers`.
+
+The top debtors list is stored on the same row. It is refreshed from the
+`(tenant_id, outstanding_balance)` index, reading only the top N entries,
+whenever a page changes customer data. A missing stats row (new tenant,
+after a snapshot import) is rebuilt once with a full aggregate.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from sqlalchemy import case, distinct, func, select, update
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .history import from_cents, to_cents
+from .models import Customer, CustomerLink, CustomerStats
+from .tracing import log_event
+
+settings = get_settings()
+
+
+def is_over_limit(outstanding: Optional[float], credit_limit: Optional[float]) -> bool:
+    return (outstanding or 0) > 0 and (outstanding or 0) > (credit_limit or 0)
+
+
+def row_stats(values: Optional[Mapping[str, Any]]) -> Tuple[int, int, int]:
+    """(count, outstanding cents, over limit) contributed by one live customer row"""
+    if values is None:
+        return 0, 0, 0
+    outstanding = values.get("outstanding_balance")
+    return 1, to_cents(outstanding) or 0, int(is_over_limit(outstanding, values.get("credit_limit")))
+
+
+def stats_delta(changes: Iterable[Tuple[Optional[Mapping[str, Any]], Optional[Mapping[str, Any]]]]) -> Tuple[int, int, int]:
+    """Sum of (new - old) contributions; None means the row is not live"""
+    count = cents = over = 0
+    for old, new in changes:
+        old_stats, new_stats = row_stats(old), row_stats(new)
+        count += new_stats[0] - old_stats[0]
+        cents += new_stats[1] - old_stats[1]
+        over += new_stats[2] - old_stats[2]
+    return count, cents, over
+
+
+def live_linked_count(db: Session, tenant_id: str) -> int:
+    return db.query(func.count(distinct(CustomerLink.ewity_customer_id))).join(
+        Customer,
+        (Customer.id == CustomerLink.ewity_customer_id) & (Customer.tenant_id == CustomerLink.tenant_id)
+    ).filter(
+        CustomerLink.tenant_id == tenant_id,
+        Customer.deleted_at.is_(None)
+    ).scalar() or 0
+
+
+def top_debtors(db: Session, tenant_id: str) -> list:
+    rows = (
+        db.query(Customer.id, Customer.name, Customer.outstanding_balance, Customer.credit_limit)
+        .filter(
+            Customer.tenant_id == tenant_id,
+            Customer.outstanding_balance > 0,
+            Customer.deleted_at.is_(None)
+        )
+        .order_by(Customer.outstanding_balance.desc())
+        .limit(settings.dashboard_top_debtors)
+        .all()
+    )
+    return [
+        {"customer_id": id, "name": name, "outstanding_balance": outstanding, "credit_limit": credit_limit}
+        for id, name, outstanding, credit_limit in rows
+    ]
+
+
+def rebuild_stats(db: Session, tenant_id: str) -> CustomerStats:
+    """Recompute a tenant's stats row from scratch (not committed)"""
+    count, outstanding, over = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(func.round(Customer.outstanding_balance * 100)), 0),
+            func.coalesce(func.sum(case(
+                (
+                    (Customer.outstanding_balance > 0)
+                    & (Customer.outstanding_balance > func.coalesce(Customer.credit_limit, 0)),
+                    1
+                ),
+                else_=0
+            )), 0)
+        ).where(Customer.tenant_id == tenant_id, Customer.deleted_at.is_(None))
+    ).one()
+
+    stats = db.get(CustomerStats, tenant_id) or CustomerStats(tenant_id=tenant_id)
+    stats.customer_count = count
+    stats.outstanding_cents = int(outstanding)
+    stats.over_limit_count = over
+    stats.linked_count = live_linked_count(db, tenant_id)
+    stats.top_debtors = json.dumps(top_debtors(db, tenant_id))
+    stats.updated_at = datetime.utcnow()
+    db.add(stats)
+    db.flush()
+    log_event("dashboard_stats_rebuilt", tenant_id=tenant_id, customers=count)
+    return stats
+
+
+def apply_changes(
+    db: Session,
+    tenant_id: str,
+    changes: Iterable[Tuple[Optional[Mapping[str, Any]], Optional[Mapping[str, Any]]]],
+    refresh_top: bool = True,
+    refresh_linked: bool = False
+) -> None:
+    """Fold (old, new) customer row changes into the tenant's stats (not committed)
+
+    Must run after the changed rows are written, in the same transaction.
+    """
+    count, cents, over = stats_delta(changes)
+    values: Dict[str, Any] = {
+        "customer_count": CustomerStats.customer_count + count,
+        "outstanding_cents": CustomerStats.outstanding_cents + cents,
+        "over_limit_count": CustomerStats.over_limit_count + over,
+        "updated_at": datetime.utcnow(),
+    }
+    if refresh_top:
+        values["top_debtors"] = json.dumps(top_debtors(db, tenant_id))
+    if refresh_linked:
+        values["linked_count"] = live_linked_count(db, tenant_id)
+
+    updated = db.execute(
+        update(CustomerStats).where(CustomerStats.tenant_id == tenant_id).values(**values)
+    ).rowcount
+    if not updated:
+        rebuild_stats(db, tenant_id)
+
+
+def refresh_linked(db: Session, tenant_id: str) -> None:
+    """Recount linked customers after links were added or removed (not committed)"""
+    apply_changes(db, tenant_id, [], refresh_top=False, refresh_linked=True)
+
+
+def dashboard(db: Session, tenant_id: str) -> Dict[str, Any]:
+    """The tenant's dashboard aggregates (one primary-key read)"""
+    stats = db.get(CustomerStats, tenant_id)
+    if stats is None:
+        stats = rebuild_stats(db, tenant_id)
+        db.commit()
+
+    return {
+        "customer_count": stats.customer_count,
+        "linked_count": stats.linked_count,
+        "unlinked_count": max(stats.customer_count - stats.linked_count, 0),
+        "total_outstanding": from_cents(stats.outstanding_cents),
+        "over_limit_count": stats.over_limit_count,
+        "top_debtors": json.loads(stats.top_debtors or "[]"),
+        "updated_at": stats.updated_at,
+    }
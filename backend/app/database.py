@@ -1,8 +1,10 @@
 """Database connection and session management"""
+import zlib
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
+from .metrics import instrument_engine
 
 settings = get_settings()
 
@@ -11,6 +13,7 @@ engine = create_engine(
     settings.database_url,
     connect_args={"check_same_thread": False}  # Needed for SQLite
 )
+instrument_engine(engine)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -19,6 +22,43 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def schema_fingerprint() -> int:
+    """31-bit fingerprint of the declared tables, primary keys, options, columns and indexes"""
+    from . import models  # noqa: F401  (registers every table on Base)
+
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda table: table.name):
+        parts.append(f"{table.name} pk:{','.join(column.name for column in table.primary_key)}")
+        parts.extend(f"{table.name} {name}={value}" for name, value in sorted(table.dialect_kwargs.items()))
+        parts.extend(f"{table.name}.{column.name}:{column.type}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return zlib.crc32("\n".join(parts).encode()) & 0x7FFFFFFF
+
+
+def ensure_schema() -> bool:
+    """Create missing tables, unless the database already has this schema
+
+    On SQLite the fingerprint of the schema last created is kept in
+    `PRAGMA user_version`, so a restart with unchanged models skips
+    `create_all` (and its per-table reflection). Like `create_all`, this
+    never adds columns to existing tables. Returns True if `create_all` ran.
+    """
+    if engine.dialect.name != "sqlite":
+        Base.metadata.create_all(bind=engine)
+        return True
+
+    fingerprint = schema_fingerprint()
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == fingerprint:
+            return False
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+        conn.commit()
+    return True
+
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
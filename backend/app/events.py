@@ -0,0 +1,89 @@
+"""In-process pub/sub for live balance updates (Server-Sent Events)"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+def balance_snapshot(customer_data: Dict[str, Any], last_updated: Optional[datetime] = None) -> Dict[str, Any]:
+    """Balance fields pushed to subscribers (Ewity snake_case field names)"""
+    return {
+        "customer_name": customer_data.get("name") or "Unknown",
+        "customer_phone": customer_data.get("mobile"),
+        "credit_limit": customer_data.get("credit_limit", 0) or 0,
+        "total_outstanding": customer_data.get("total_outstanding", 0) or 0,
+        "total_spent": customer_data.get("total_spent", 0) or 0,
+        "loyalty_text": customer_data.get("loyalty_text"),
+        "last_updated": (last_updated or datetime.utcnow()).isoformat(),
+    }
+
+
+def format_sse(event: str, data: str) -> str:
+    """Encode a single SSE message"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class BalanceBroadcaster:
+    """Fan out balance changes to SSE subscribers, keyed by tenant and customer ID.
+
+    Each subscriber owns a single-slot queue: if a subscriber is slow, an
+    unread update is replaced by the newer one, so memory per idle
+    connection stays constant. A message is serialised once per change and
+    shared by all subscribers. State is per process; with several workers
+    each worker only sees changes made by its own sync runs and requests.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[Tuple[str, int], Set[asyncio.Queue]] = {}
+        # Last pushed (outstanding, spent) per watched customer
+        self._last: Dict[Tuple[str, int], Tuple[Any, Any]] = {}
+        self.connections = 0
+
+    @staticmethod
+    def _balance_key(customer_data: Dict[str, Any]) -> Tuple[Any, Any]:
+        return (customer_data.get("total_outstanding"), customer_data.get("total_spent"))
+
+    def subscribe(self, tenant_id: str, customer_id: int, customer_data: Optional[Dict[str, Any]] = None) -> asyncio.Queue:
+        """Register a subscriber; `customer_data` is the state it already has"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        key = (tenant_id, customer_id)
+        subscribers = self._subscribers.setdefault(key, set())
+        if not subscribers and customer_data:
+            self._last[key] = self._balance_key(customer_data)
+        subscribers.add(queue)
+        self.connections += 1
+        return queue
+
+    def unsubscribe(self, tenant_id: str, customer_id: int, queue: asyncio.Queue) -> None:
+        key = (tenant_id, customer_id)
+        subscribers = self._subscribers.get(key)
+        if not subscribers or queue not in subscribers:
+            return
+        subscribers.discard(queue)
+        self.connections -= 1
+        if not subscribers:
+            del self._subscribers[key]
+            self._last.pop(key, None)
+
+    def publish(self, tenant_id: str, customer_id: int, customer_data: Dict[str, Any]) -> bool:
+        """Push new balance data if it differs from what subscribers last saw"""
+        key = (tenant_id, customer_id)
+        subscribers = self._subscribers.get(key)
+        if not subscribers:
+            return False
+
+        balance = self._balance_key(customer_data)
+        if self._last.get(key) == balance:
+            return False
+        self._last[key] = balance
+
+        message = format_sse("balance", json.dumps(balance_snapshot(customer_data)))
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+        return True
+
+
+# Global broadcaster instance
+balance_events = BalanceBroadcaster()
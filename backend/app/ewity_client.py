@@ -1,33 +1,160 @@
-"""Ewity API client with caching"""
-import httpx
+"""Ewity API client with caching
+
+httpx (and the transport module) are imported on first use, so importing
+the app does not pay for them until Ewity is actually called.
+"""
+import asyncio
 import json
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
+from sqlalchemy import delete, insert, literal, null, select, update
 from sqlalchemy.orm import Session
 from .config import get_settings
 from .cache import cache
+from .events import balance_events
+from .responses import payload_cache
+from .metrics import EWITY_REQUESTS, EWITY_REQUEST_DURATION
+from .tracing import log_event, span
+from .budget import UpstreamBudget, UpstreamBudgetExceeded, current_origin, upstream_budget
+from .dashboard import apply_changes
+from .hedging import Hedger
+from .history import compact_history, record_points
+from .models import DEFAULT_TENANT, Customer, CustomerChange, CustomerLink
+from .sync_engine import ResourceSpec, SyncPage, sync_resource
+
+if TYPE_CHECKING:
+    import httpx
 
 settings = get_settings()
 
 
-class EwityClient:
-    """Client for Ewity POS API"""
+def customer_row_to_dict(customer) -> Dict[str, Any]:
+    """Convert a local Customer row to the Ewity customer dict shape
+
+    Every upstream field comes from the stored record; promoted columns
+    take precedence so the result matches what sync last wrote.
+    """
+    record = json.loads(customer.data) if customer.data else {}
+    record.update({
+        "id": customer.id,
+        "name": customer.name,
+        "mobile": customer.mobile,
+        "email": customer.email,
+        "address": customer.address,
+        "company_name": customer.company_name,
+        "credit_limit": customer.credit_limit,
+        "creditLimit": customer.credit_limit,  # API uses camelCase
+        "total_outstanding": customer.outstanding_balance,
+        "total_spent": customer.total_spent,
+        "outstandingBalance": customer.outstanding_balance,  # API uses camelCase
+        "totalSpent": customer.total_spent,  # API uses camelCase
+        "loyalty_points": customer.loyalty_points,
+        "loyalty_text": customer.loyalty_text,
+        "synced_at": customer.synced_at,
+    })
+    return record
+
+
+def customer_search_dict(customer) -> Dict[str, Any]:
+    """Convert a local Customer row to the admin search result shape"""
+    return {
+        "id": customer.id,
+        "name": customer.name,
+        "mobile": customer.mobile,
+        "email": customer.email,
+        "address": customer.address,
+        "creditLimit": customer.credit_limit,
+        "totalSpent": customer.total_spent,
+        "outstandingBalance": customer.outstanding_balance
+    }
+
+
+def search_pagination(total: int, page: int, page_size: int) -> Dict[str, int]:
+    return {
+        "total": total,
+        "page": page,
+        "pageSize": page_size,
+        "totalPages": (total + page_size - 1) // page_size
+    }
 
-    def __init__(self):
-        self.base_url = settings.ewity_api_base_url
-        self.headers = {"Authorization": f"Bearer {settings.ewity_api_token}"}
+
+class EwityClient:
+    """Client for Ewity POS API
+
+    One client per tenant (shop): each has its own token, pooled HTTP
+    client, call budget and cache namespace. Without arguments it is the
+    default tenant's client, configured from settings.
+    """
+
+    def __init__(
+        self,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        tenant_id: str = DEFAULT_TENANT,
+        api_token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        budget: Optional[UpstreamBudget] = None
+    ):
+        self.tenant_id = tenant_id
+        self.base_url = base_url or settings.ewity_api_base_url
+        self.api_token = api_token or settings.ewity_api_token
+        self.headers = {"Authorization": f"Bearer {self.api_token}"}
+        self.transport = transport
+        self.budget = budget or upstream_budget
+        self.hedger = Hedger()
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        """Shared HTTP client; the transport comes from settings unless given"""
+        import httpx
+        from .ewity_transport import build_transport
+
+        if self._client is None or self._client.is_closed:
+            if self.transport is None:
+                self.transport = build_transport(self.tenant_id, self.api_token)
+            self._client = httpx.AsyncClient(transport=self.transport, timeout=10.0)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client (and its transport)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self.transport = None
 
     async def _get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make GET request to Ewity API"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}{endpoint}",
-                headers=self.headers,
-                params=params,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return response.json()
+        origin = current_origin()
+        if self.budget.exhausted():
+            EWITY_REQUESTS.labels(endpoint, "budget_exceeded", origin).inc()
+            raise UpstreamBudgetExceeded(f"Ewity call budget exhausted (tenant: {self.tenant_id}, origin: {origin})")
+        self.budget.record(origin)
+
+        def send():
+            return self._http().get(f"{self.base_url}{endpoint}", headers=self.headers, params=params)
+
+        def may_hedge() -> bool:
+            # The duplicate is a real upstream call, so it is budgeted like one
+            if self.budget.should_degrade():
+                return False
+            self.budget.record(origin)
+            return True
+
+        started = time.perf_counter()
+        status_label = "error"
+        try:
+            with span("ewity_get"):
+                if settings.ewity_hedge_enabled:
+                    response = await self.hedger.run(endpoint, send, may_hedge)
+                else:
+                    response = await send()
+                status_label = str(response.status_code)
+                response.raise_for_status()
+                return response.json()
+        finally:
+            EWITY_REQUESTS.labels(endpoint, status_label, origin).inc()
+            EWITY_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - started)
 
     async def get_customer(self, customer_id: int, db: Optional[Session] = None) -> Optional[Dict[str, Any]]:
         """Get customer by ID from local database, fallback to API if needed"""
@@ -35,31 +162,23 @@ class EwityClient:
 
         try:
             if not db:
-                print("Warning: No database session provided for get_customer")
+                log_event("get_customer_no_session", logging.WARNING, customer_id=customer_id)
                 return None
 
             # Check local database first
-            customer = db.query(Customer).filter(Customer.id == customer_id).first()
+            customer = db.query(Customer).filter(
+                Customer.id == customer_id, Customer.tenant_id == self.tenant_id
+            ).first()
 
             if customer:
+                # Removed upstream by a previous full sync
+                if customer.deleted_at is not None:
+                    return None
                 # Return customer data from local database
-                return {
-                    "id": customer.id,
-                    "name": customer.name,
-                    "mobile": customer.mobile,
-                    "email": customer.email,
-                    "address": customer.address,
-                    "credit_limit": customer.credit_limit,
-                    "creditLimit": customer.credit_limit,  # API uses camelCase
-                    "total_outstanding": customer.outstanding_balance,
-                    "total_spent": customer.total_spent,
-                    "outstandingBalance": customer.outstanding_balance,  # API uses camelCase
-                    "totalSpent": customer.total_spent,  # API uses camelCase
-                    "loyalty_text": None,  # Not stored in local DB
-                }
+                return customer_row_to_dict(customer)
 
             # If not in local database, fetch from API and cache it
-            print(f"Customer {customer_id} not in local DB, fetching from API...")
+            log_event("customer_not_in_db", customer_id=customer_id)
             data = await self._get("/customers", params={"page": 1})
             customers = data.get("data", [])
 
@@ -68,6 +187,7 @@ class EwityClient:
                     # Store in database for future use
                     new_customer = Customer(
                         id=customer_id,
+                        tenant_id=self.tenant_id,
                         name=customer_data.get("name"),
                         mobile=customer_data.get("mobile"),
                         email=customer_data.get("email"),
@@ -75,76 +195,64 @@ class EwityClient:
                         credit_limit=customer_data.get("credit_limit"),  # API uses snake_case
                         total_spent=customer_data.get("total_spent"),  # API uses snake_case
                         outstanding_balance=customer_data.get("total_outstanding"),  # API uses snake_case
+                        company_name=customer_data.get("company_name"),
+                        loyalty_points=customer_data.get("loyalty_points"),
+                        loyalty_text=customer_data.get("loyalty_text"),
                         data=json.dumps(customer_data),
                         synced_at=datetime.utcnow()
                     )
                     db.add(new_customer)
+                    db.flush()
+                    apply_changes(db, self.tenant_id, [(None, CUSTOMER_RESOURCE.row_values(customer_data))])
                     db.commit()
                     return customer_data
 
             return None
 
         except Exception as e:
-            print(f"Error fetching customer {customer_id}: {e}")
+            log_event("get_customer_error", logging.ERROR, customer_id=customer_id, error=str(e))
             return None
 
-    async def search_customers(self, query: str, page: int = 1, db: Optional[Session] = None) -> Dict[str, Any]:
-        """Search customers by name or phone from local database"""
+    def search_customer_rows(self, query: str, page: int, db: Session, page_size: int = 20):
+        """Find one page of matching local customers. Returns (rows, total matches)"""
         from .models import Customer
 
+        matches = db.query(Customer).filter(
+            Customer.tenant_id == self.tenant_id,
+            Customer.deleted_at.is_(None),
+            (Customer.name.ilike(f"%{query}%")) |
+            (Customer.mobile.like(f"%{query}%"))
+        )
+        total = matches.count()
+        rows = (
+            matches.order_by(Customer.id)
+            .offset((max(page, 1) - 1) * page_size)
+            .limit(page_size)
+            .all()
+        )
+        return rows, total
+
+    async def search_customers(self, query: str, page: int = 1, db: Optional[Session] = None) -> Dict[str, Any]:
+        """Search customers by name or phone from local database"""
         try:
             if not db:
-                print("Warning: No database session provided for search")
+                log_event("search_no_session", logging.WARNING)
                 return {"data": [], "pagination": {}}
 
-            # Search in local database
-            query_lower = query.lower()
-
-            # Use SQLAlchemy to search
-            results = db.query(Customer).filter(
-                (Customer.name.ilike(f"%{query}%")) |
-                (Customer.mobile.like(f"%{query}%"))
-            ).all()
-
-            # Convert to dict format
-            filtered = []
-            for customer in results:
-                customer_dict = {
-                    "id": customer.id,
-                    "name": customer.name,
-                    "mobile": customer.mobile,
-                    "email": customer.email,
-                    "address": customer.address,
-                    "creditLimit": customer.credit_limit,
-                    "totalSpent": customer.total_spent,
-                    "outstandingBalance": customer.outstanding_balance
-                }
-                filtered.append(customer_dict)
-
-            # Paginate the filtered results
             page_size = 20
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            paginated_filtered = filtered[start_idx:end_idx]
-
-            result = {
-                "data": paginated_filtered,
-                "pagination": {
-                    "total": len(filtered),
-                    "page": page,
-                    "pageSize": page_size,
-                    "totalPages": (len(filtered) + page_size - 1) // page_size
-                }
-            }
+            rows, total = self.search_customer_rows(query, page, db, page_size)
 
-            return result
+            return {
+                "data": [customer_search_dict(customer) for customer in rows],
+                "pagination": search_pagination(total, page, page_size)
+            }
         except Exception as e:
-            print(f"Error searching customers: {e}")
+            log_event("search_error", logging.ERROR, error=str(e))
             return {"data": [], "pagination": {}}
 
     async def get_all_customers(self, page: int = 1) -> Dict[str, Any]:
         """Get all customers with caching"""
-        cache_key = f"customers:page:{page}"
+        cache_key = f"{self.tenant_id}:customers:page:{page}"
 
         cached = cache.get(cache_key)
         if cached:
@@ -155,86 +263,219 @@ class EwityClient:
             cache.set(cache_key, data)
             return data
         except Exception as e:
-            print(f"Error fetching customers: {e}")
+            log_event("get_all_customers_error", logging.ERROR, page=page, error=str(e))
             return {"data": [], "pagination": {}}
 
-    async def sync_all_customers_to_db(self, db: Session) -> Dict[str, Any]:
-        """Fetch all customers from Ewity and sync to local database"""
-        from .models import Customer
-
-        try:
-            print("🔄 Syncing customers from Ewity API...")
-
-            synced_count = 0
-            updated_count = 0
-            page = 1
-            total_pages = 1
-
-            # Fetch all pages
-            while page <= total_pages:
-                print(f"  Fetching page {page}...")
-
-                # Fetch customers page by page (API always returns 20 per page regardless of pageSize)
-                data = await self._get("/customers", params={"page": page})
-                customers = data.get("data", [])
-                pagination = data.get("pagination", {})
-
-                # Update total pages from first response
-                if page == 1:
-                    # API uses 'lastPage' not 'totalPages'
-                    total_pages = pagination.get("lastPage", 1)
-                    total_customers = pagination.get("total", 0)
-                    print(f"  Found {total_pages} pages ({total_customers} total customers)")
-
-                # Process customers from this page
-                for customer_data in customers:
-                    customer_id = customer_data.get("id")
-                    if not customer_id:
-                        continue
-
-                    # Check if customer exists
-                    existing = db.query(Customer).filter(Customer.id == customer_id).first()
-
-                    customer_obj = existing or Customer(id=customer_id)
-                    customer_obj.name = customer_data.get("name")
-                    customer_obj.mobile = customer_data.get("mobile")
-                    customer_obj.email = customer_data.get("email")
-                    customer_obj.address = customer_data.get("address")
-                    customer_obj.credit_limit = customer_data.get("credit_limit")  # API uses snake_case
-                    customer_obj.total_spent = customer_data.get("total_spent")  # API uses snake_case
-                    customer_obj.outstanding_balance = customer_data.get("total_outstanding")  # API uses snake_case
-                    customer_obj.data = json.dumps(customer_data)
-                    customer_obj.synced_at = datetime.utcnow()
-
-                    if existing:
-                        updated_count += 1
-                    else:
-                        db.add(customer_obj)
-                        synced_count += 1
-
-                # Commit after each page to avoid memory issues
-                db.commit()
-                print(f"  ✓ Processed page {page}/{total_pages}")
-
-                page += 1
-
-            total = synced_count + updated_count
-            print(f"✓ Synced {total} customers ({synced_count} new, {updated_count} updated)")
-
-            return {
-                "success": True,
-                "total": total,
-                "new": synced_count,
-                "updated": updated_count
-            }
-
-        except Exception as e:
-            print(f"❌ Error syncing customers: {e}")
-            db.rollback()
-            return {
-                "success": False,
-                "error": str(e)
-            }
+    async def _get_page_with_retries(self, endpoint: str, page: int) -> Dict[str, Any]:
+        """Fetch one list page, retrying transient failures with backoff"""
+        import httpx
+
+        for attempt in range(settings.sync_page_retries + 1):
+            try:
+                return await self._get(endpoint, params={"page": page})
+            except httpx.HTTPError as e:
+                status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                transient = status_code is None or status_code == 429 or status_code >= 500
+                if not transient or attempt == settings.sync_page_retries:
+                    raise
+                delay = settings.sync_retry_backoff_seconds * 2 ** attempt
+                log_event("sync_page_retry", logging.WARNING, endpoint=endpoint, page=page, attempt=attempt + 1, delay=delay, error=str(e))
+                await asyncio.sleep(delay)
+
+    async def sync_resource(
+        self,
+        db: Session,
+        spec: ResourceSpec,
+        job=None,
+        cancel_event: Optional[asyncio.Event] = None
+    ) -> Dict[str, Any]:
+        """Mirror any paginated Ewity resource locally (see sync_engine)"""
+        return await sync_resource(self, db, spec, job=job, cancel_event=cancel_event)
+
+    async def sync_all_customers_to_db(
+        self,
+        db: Session,
+        job=None,
+        cancel_event: Optional[asyncio.Event] = None
+    ) -> Dict[str, Any]:
+        """Fetch all customers from Ewity and sync to local database
+
+        Runs the generic resource sync with the customer hooks: new rows and
+        balance changes go to the change log and balance history, changed
+        rows drop their cached payloads, balance changes are pushed to live
+        subscribers once committed, and customers missing from a complete
+        run are tombstoned. With a SyncJob, resumes from its checkpoint.
+        """
+        return await sync_resource(self, db, CUSTOMER_RESOURCE, job=job, cancel_event=cancel_event)
+
+
+def balance_changed(old, customer_data: Dict[str, Any]) -> bool:
+    return (
+        old["outstanding_balance"] != customer_data.get("total_outstanding")
+        or old["total_spent"] != customer_data.get("total_spent")
+    )
+
+
+def record_customer_changes(db: Session, page: SyncPage) -> None:
+    """Append change log and history rows for a page, update dashboard stats; drop stale payloads"""
+    if page.inserted or page.changed:
+        # Tombstoned rows count as absent, so a resurrected customer is added back
+        apply_changes(
+            db,
+            page.tenant_id,
+            [(None, CUSTOMER_RESOURCE.row_values(record)) for record in page.inserted]
+            + [
+                (old if old["deleted_at"] is None else None, CUSTOMER_RESOURCE.row_values(record))
+                for old, record in page.changed
+            ],
+            refresh_linked=bool(page.inserted) or any(old["deleted_at"] is not None for old, _ in page.changed)
+        )
+
+    change_rows = []
+    for customer_data in page.inserted:
+        change_rows.append({
+            "tenant_id": page.tenant_id,
+            "customer_id": customer_data["id"],
+            "kind": "new",
+            "old_outstanding": None,
+            "new_outstanding": customer_data.get("total_outstanding"),
+            "old_spent": None,
+            "new_spent": customer_data.get("total_spent"),
+            "changed_at": page.now,
+        })
+
+    for old, customer_data in page.changed:
+        # Upstream data changed, so serialised payloads are stale
+        payload_cache.invalidate(page.tenant_id, old["id"])
+        if old["deleted_at"] is None and not balance_changed(old, customer_data):
+            continue
+        change_rows.append({
+            "tenant_id": page.tenant_id,
+            "customer_id": old["id"],
+            "kind": "changed" if old["deleted_at"] is None else "new",
+            "old_outstanding": old["outstanding_balance"],
+            "new_outstanding": customer_data.get("total_outstanding"),
+            "old_spent": old["total_spent"],
+            "new_spent": customer_data.get("total_spent"),
+            "changed_at": page.now,
+        })
+
+    if change_rows:
+        db.execute(insert(CustomerChange), change_rows)
+        record_points(db, change_rows)
+
+
+def publish_balance_changes(page: SyncPage) -> None:
+    """Push committed balance changes to live subscribers"""
+    for old, customer_data in page.changed:
+        if old["deleted_at"] is None and balance_changed(old, customer_data):
+            balance_events.publish(page.tenant_id, old["id"], customer_data)
+            page.counts["balance_changes"] += 1
+
+
+def sweep_unseen_customers(db: Session, generation: int, tenant_id: str) -> int:
+    """Tombstone customers a complete sync did not see and flag their links
+
+    Runs as set-based statements: one UPDATE tombstones every row stamped
+    with an older generation (and returns what dashboard stats need to
+    subtract) and one INSERT logs them as removed, DELETEs
+    purge tombstones and change log entries past their retention, and two
+    UPDATEs set or clear `customer_missing_at` on links. Old balance
+    history is compacted afterwards. Returns the number of newly
+    tombstoned customers.
+    """
+    now = datetime.utcnow()
+    removed = db.execute(
+        update(Customer)
+        .where(Customer.tenant_id == tenant_id)
+        .where(Customer.deleted_at.is_(None))
+        .where((Customer.sync_generation.is_(None)) | (Customer.sync_generation < generation))
+        .values(deleted_at=now)
+        .returning(Customer.id, Customer.outstanding_balance, Customer.credit_limit)
+    ).mappings().all()
+    removed_ids = [row["id"] for row in removed]
+
+    if removed_ids:
+        apply_changes(db, tenant_id, [(row, None) for row in removed], refresh_linked=True)
+        db.execute(
+            insert(CustomerChange).from_select(
+                ["tenant_id", "customer_id", "kind", "old_outstanding", "new_outstanding", "old_spent", "new_spent", "changed_at"],
+                select(
+                    Customer.tenant_id,
+                    Customer.id,
+                    literal("removed"),
+                    Customer.outstanding_balance,
+                    null(),
+                    Customer.total_spent,
+                    null(),
+                    literal(now),
+                ).where(Customer.tenant_id == tenant_id, Customer.deleted_at == now)
+            )
+        )
+
+    purge_before = now - timedelta(days=settings.customer_tombstone_retention_days)
+    purged = db.execute(
+        delete(Customer).where(Customer.tenant_id == tenant_id, Customer.deleted_at < purge_before)
+    ).rowcount
+    db.execute(
+        delete(CustomerChange).where(
+            CustomerChange.tenant_id == tenant_id,
+            CustomerChange.changed_at < now - timedelta(days=settings.change_log_retention_days)
+        )
+    )
+
+    live_ids = select(Customer.id).where(Customer.tenant_id == tenant_id, Customer.deleted_at.is_(None))
+    flagged = db.execute(
+        update(CustomerLink)
+        .where(CustomerLink.tenant_id == tenant_id)
+        .where(CustomerLink.customer_missing_at.is_(None))
+        .where(CustomerLink.ewity_customer_id.not_in(live_ids))
+        .values(customer_missing_at=now)
+    ).rowcount
+    db.execute(
+        update(CustomerLink)
+        .where(CustomerLink.tenant_id == tenant_id)
+        .where(CustomerLink.customer_missing_at.is_not(None))
+        .where(CustomerLink.ewity_customer_id.in_(live_ids))
+        .values(customer_missing_at=None)
+    )
+    db.commit()
+
+    for customer_id in removed_ids:
+        payload_cache.invalidate(tenant_id, customer_id)
+    log_event(
+        "sync_sweep_done",
+        tenant_id=tenant_id,
+        generation=generation,
+        tombstoned=len(removed_ids),
+        purged=purged,
+        links_flagged=flagged
+    )
+
+    compact_history(db)
+    return len(removed_ids)
+
+
+CUSTOMER_RESOURCE = ResourceSpec(
+    "customers",
+    "/customers",
+    Customer,
+    {
+        "name": "name",
+        "mobile": "mobile",
+        "email": "email",
+        "address": "address",
+        "credit_limit": "credit_limit",  # API uses snake_case
+        "total_spent": "total_spent",
+        "outstanding_balance": "total_outstanding",
+        "company_name": "company_name",
+        "loyalty_points": "loyalty_points",
+        "loyalty_text": "loyalty_text",
+    },
+    on_page=record_customer_changes,
+    after_commit=publish_balance_changes,
+    sweep=sweep_unseen_customers
+)
 
 
 # Global client instance
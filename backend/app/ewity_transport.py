@@ -0,0 +1,278 @@
+"""Pluggable HTTP transports for EwityClient: live, record and replay
+
+Cassettes are NDJSON files (gzip-compressed when the name ends in `.gz`).
+The first line is a header, then two kinds of entries:
+
+    {"kind": "body", "id": "<hash>", "body": {...}}     # each distinct body once
+    {"kind": "call", "t": 1.234, "dur": 0.153, "tenant": "default", "method": "GET",
+     "path": "/v1/customers", "query": "page=2", "status": 200, "body_id": "<hash>"}
+
+`t` is seconds since recording started and `dur` the upstream latency.
+Every tenant's client records into the same cassette, opened once per
+process; `tenant` says whose call it was and replay only serves a client
+its own tenant's calls. Request headers are never written, token-like
+query parameters are masked and the recording client's API token is
+scrubbed from response bodies.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import httpx
+from .config import get_settings
+from .models import DEFAULT_TENANT
+
+settings = get_settings()
+
+CASSETTE_VERSION = 1
+SCRUBBED = "<scrubbed>"
+SENSITIVE_PARAMS = ("token", "key", "secret", "password", "auth")
+REPLAY_TIMINGS = ("original", "latency", "none")
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _dumps(entry: Dict[str, Any]) -> str:
+    return json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+
+
+def normalise_query(query: str) -> str:
+    """Sorted query string with sensitive parameter values masked"""
+    pairs = []
+    for name, value in sorted(parse_qsl(query, keep_blank_values=True)):
+        if any(word in name.lower() for word in SENSITIVE_PARAMS):
+            value = SCRUBBED
+        pairs.append((name, value))
+    return urlencode(pairs)
+
+
+class CassetteWriter:
+    """A cassette file shared by every recording transport in the process
+
+    The file is truncated and given its header only the first time it is
+    opened; when the last transport closes it the file is closed, and a
+    later transport (a tenant client recreated after a token change)
+    appends to it instead of truncating it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._started = time.monotonic()
+        self._seen_bodies = set()
+        self._file = None
+        self._opened = False
+        self._users = 0
+
+    def acquire(self) -> "CassetteWriter":
+        if self._file is None:
+            self._file = _open(self.path, "a" if self._opened else "w")
+            if not self._opened:
+                self.write({
+                    "kind": "header",
+                    "version": CASSETTE_VERSION,
+                    "recorded_at": datetime.utcnow().isoformat(),
+                })
+            self._opened = True
+        self._users += 1
+        return self
+
+    def release(self) -> None:
+        self._users -= 1
+        if self._users <= 0 and self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def offset(self) -> float:
+        return time.monotonic() - self._started
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        self._file.write(_dumps(entry) + "\n")
+        self._file.flush()
+
+    def write_body(self, body: Any) -> str:
+        """Store a body once and return its ID"""
+        body_id = hashlib.sha1(_dumps({"b": body}).encode()).hexdigest()[:16]
+        if body_id not in self._seen_bodies:
+            self._seen_bodies.add(body_id)
+            self.write({"kind": "body", "id": body_id, "body": body})
+        return body_id
+
+
+# One writer per cassette path for the life of the process
+_writers: Dict[str, CassetteWriter] = {}
+
+
+def cassette_writer(path: str) -> CassetteWriter:
+    writer = _writers.get(path)
+    if writer is None:
+        writer = _writers[path] = CassetteWriter(path)
+    return writer.acquire()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Pass requests to a real transport and append each exchange to a cassette"""
+
+    def __init__(
+        self,
+        path: str,
+        inner: Optional[httpx.AsyncBaseTransport] = None,
+        tenant_id: str = DEFAULT_TENANT,
+        api_token: Optional[str] = None
+    ):
+        self.path = path
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.tenant_id = tenant_id
+        self.api_token = api_token
+        self.writer = cassette_writer(path)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        offset = self.writer.offset()
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        duration = time.perf_counter() - started
+
+        text = content.decode("utf-8", errors="replace")
+        if self.api_token:
+            text = text.replace(self.api_token, SCRUBBED)
+        try:
+            body: Any = json.loads(text)
+        except ValueError:
+            body = text
+        body_id = self.writer.write_body(body)
+
+        self.writer.write({
+            "kind": "call",
+            "t": round(offset, 4),
+            "dur": round(duration, 4),
+            "tenant": self.tenant_id,
+            "method": request.method,
+            "path": request.url.path,
+            "query": normalise_query(request.url.query.decode()),
+            "status": response.status_code,
+            "body_id": body_id,
+        })
+
+        # Content is already decoded, so drop encoding/length headers
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=content,
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+        self.writer.release()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve responses from a cassette without touching the network.
+
+    Only the given tenant's calls are loaded (entries without a tenant are
+    the default tenant's). Calls are matched on method, path and normalised
+    query. Repeated calls get the recorded responses in order, wrapping
+    around at the end, so a replay is deterministic.
+
+    Timing:
+    - "original": the recorded pacing. The first response is aligned with
+      its recorded offset `t`; every response waits for its recorded
+      latency and is not returned before its offset plus latency, so a
+      client replaying faster than the recording is slowed down to it.
+    - "latency": each response waits for its recorded latency only.
+    - "none": responses return at once.
+    """
+
+    def __init__(self, path: str, timing: str = "original", tenant_id: str = DEFAULT_TENANT):
+        if timing not in REPLAY_TIMINGS:
+            raise ValueError(f"Unknown replay timing: {timing}")
+        self.path = path
+        self.timing = timing
+        self.tenant_id = tenant_id
+        self.calls: Dict[Tuple[str, str, str], Deque[Tuple[int, str, float, float]]] = {}
+        self.bodies: Dict[str, bytes] = {}
+        self._started: Optional[float] = None  # Replay clock time of recorded offset 0
+        self._load()
+
+    def _load(self) -> None:
+        with _open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["kind"] == "body":
+                    body = entry["body"]
+                    raw = body if isinstance(body, str) else _dumps(body)
+                    self.bodies[entry["id"]] = raw.encode()
+                elif entry["kind"] == "call" and entry.get("tenant", DEFAULT_TENANT) == self.tenant_id:
+                    key = (entry["method"], entry["path"], entry["query"])
+                    self.calls.setdefault(key, deque()).append(
+                        (entry["status"], entry["body_id"], entry["dur"], entry.get("t", 0.0))
+                    )
+
+    def _delay(self, duration: float, offset: float) -> float:
+        """Seconds to hold a response back under the configured timing"""
+        if self.timing == "none":
+            return 0.0
+        if self.timing == "latency":
+            return duration
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now - offset
+        # Offsets already passed (e.g. after wrapping around) still get their latency
+        return max(duration, self._started + offset + duration - now)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.method, request.url.path, normalise_query(request.url.query.decode()))
+        recorded = self.calls.get(key)
+        if not recorded:
+            return httpx.Response(404, json={
+                "code": 404,
+                "errorCode": "NOT_RECORDED",
+                "message": f"No recorded response for {request.method} {request.url.path}?{key[2]}",
+            }, request=request)
+
+        status_code, body_id, duration, offset = recorded[0]
+        recorded.rotate(-1)
+        delay = self._delay(duration, offset)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            status_code=status_code,
+            headers={"content-type": "application/json"},
+            content=self.bodies[body_id],
+            request=request,
+        )
+
+
+
+def build_transport(
+    tenant_id: str = DEFAULT_TENANT,
+    api_token: Optional[str] = None
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport selected by settings for one tenant's client
+
+    None means httpx's default live transport. `api_token` is the token
+    scrubbed from recorded bodies.
+    """
+    mode = settings.ewity_transport_mode
+    if mode == "live":
+        return None
+    if mode == "record":
+        return RecordingTransport(settings.ewity_cassette_path, tenant_id=tenant_id, api_token=api_token)
+    if mode == "replay":
+        return ReplayTransport(settings.ewity_cassette_path, settings.ewity_replay_timing, tenant_id)
+    raise ValueError(f"Unknown EWITY_TRANSPORT_MODE: {mode}")
@@ -0,0 +1,125 @@
+"""Streaming CSV/NDJSON export of the local customers table
+
+Rows are read with a streaming cursor (`yield_per`) and encoded into
+chunks of roughly `EXPORT_CHUNK_BYTES`, optionally gzip-compressed on the
+fly, so memory stays flat regardless of table size. The generator opens
+its own session because the response outlives the request's dependencies.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+import orjson
+from sqlalchemy import select
+from .database import SessionLocal
+from .models import DEFAULT_TENANT, Customer, CustomerLink
+
+EXPORT_BATCH_ROWS = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CUSTOMER_COLUMNS = [
+    ("id", Customer.id),
+    ("name", Customer.name),
+    ("mobile", Customer.mobile),
+    ("email", Customer.email),
+    ("address", Customer.address),
+    ("credit_limit", Customer.credit_limit),
+    ("outstanding_balance", Customer.outstanding_balance),
+    ("total_spent", Customer.total_spent),
+    ("company_name", Customer.company_name),
+    ("loyalty_points", Customer.loyalty_points),
+    ("loyalty_text", Customer.loyalty_text),
+    ("synced_at", Customer.synced_at),
+    ("sync_generation", Customer.sync_generation),
+    ("deleted_at", Customer.deleted_at),
+    ("data", Customer.data),  # Full upstream record (JSON string)
+]
+
+LINK_COLUMNS = [
+    ("link_uuid", CustomerLink.uuid),
+    ("link_created_at", CustomerLink.created_at),
+    ("link_last_accessed", CustomerLink.last_accessed),
+]
+
+
+def export_columns(include_links: bool) -> List[str]:
+    return [name for name, _ in CUSTOMER_COLUMNS + (LINK_COLUMNS if include_links else [])]
+
+
+def export_query(include_links: bool, include_deleted: bool, tenant_id: str = DEFAULT_TENANT):
+    columns = CUSTOMER_COLUMNS + (LINK_COLUMNS if include_links else [])
+    query = select(*(column.label(name) for name, column in columns)).where(Customer.tenant_id == tenant_id)
+    if include_links:
+        # One row per link; customers without links still appear once
+        query = query.outerjoin(CustomerLink, (CustomerLink.ewity_customer_id == Customer.id) & (CustomerLink.tenant_id == tenant_id))
+    if not include_deleted:
+        query = query.where(Customer.deleted_at.is_(None))
+    return query.order_by(Customer.id)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(rows, fmt: str, columns: List[str]) -> Iterator[bytes]:
+    """Encode rows as CSV (with header) or NDJSON in ~EXPORT_CHUNK_BYTES chunks"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        chunk = bytearray()
+        for row in rows:
+            chunk += orjson.dumps(dict(zip(columns, row)))
+            chunk += b"\n"
+            if len(chunk) >= EXPORT_CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+        if chunk:
+            yield bytes(chunk)
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_customers(
+    fmt: str = "csv",
+    include_links: bool = False,
+    include_deleted: bool = False,
+    compress: bool = False,
+    tenant_id: str = DEFAULT_TENANT
+) -> Iterator[bytes]:
+    """Yield the customers export as byte chunks"""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            export_query(include_links, include_deleted, tenant_id).execution_options(yield_per=EXPORT_BATCH_ROWS)
+        )
+        chunks = encode_rows(result, fmt, export_columns(include_links))
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        db.close()
+
+
+def export_filename(fmt: str, compress: bool, now: Optional[datetime] = None) -> str:
+    stamp = (now or datetime.utcnow()).strftime("%Y%m%d-%H%M%S")
+    return f"customers-{stamp}.{fmt}" + (".gz" if compress else "")
@@ -0,0 +1,117 @@
+"""Hedged Ewity GETs
+
+When a GET has not completed after the `ewity_hedge_percentile` of the
+endpoint's recent latency (the last `ewity_hedge_window` responses, and at
+least `ewity_hedge_min_delay_ms`), a duplicate is sent and whichever
+response arrives first is used; the other request is cancelled. Until
+`ewity_hedge_min_samples` latencies are known, requests are not hedged.
+
+Hedges are capped by a token bucket: every request adds
+`ewity_hedge_ratio` of a token (up to a small burst) and every hedge
+spends one, so duplicates stay below that fraction of requests. Each
+tenant's client has its own Hedger.
+"""
+import asyncio
+import math
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from .config import get_settings
+from .metrics import EWITY_HEDGES
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Unused hedge tokens saved up for a burst of slow responses
+MAX_HEDGE_TOKENS = 10.0
+
+
+class LatencyWindow:
+    """The most recent latencies of one endpoint"""
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float:
+        ordered = sorted(self._samples)
+        index = min(math.ceil(len(ordered) * percentile / 100) - 1, len(ordered) - 1)
+        return ordered[max(index, 0)]
+
+
+class Hedger:
+    """Latency-triggered duplicate requests within a hedging budget"""
+
+    def __init__(self):
+        self._latency: Dict[str, LatencyWindow] = defaultdict(lambda: LatencyWindow(settings.ewity_hedge_window))
+        self._tokens = 0.0
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        self._latency[endpoint].add(seconds)
+
+    def delay(self, endpoint: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None when there is too little data"""
+        window = self._latency[endpoint]
+        if len(window) < settings.ewity_hedge_min_samples:
+            return None
+        return max(window.percentile(settings.ewity_hedge_percentile), settings.ewity_hedge_min_delay_ms / 1000)
+
+    async def run(
+        self,
+        endpoint: str,
+        send: Callable[[], Awaitable[T]],
+        may_hedge: Callable[[], bool]
+    ) -> T:
+        """Await `send()`, starting a second `send()` if the first is slow
+
+        `may_hedge` is checked just before hedging (e.g. against the call
+        budget) and should record the extra call when it allows it; a hedge
+        token is only spent once it has. An attempt cancelled because the
+        other one won still records how long it had been running, so slow
+        responses keep counting towards the percentile.
+        """
+        self._tokens = min(self._tokens + settings.ewity_hedge_ratio, MAX_HEDGE_TOKENS)
+        delay = self.delay(endpoint)
+        loop = asyncio.get_running_loop()
+
+        async def attempt() -> T:
+            started = loop.time()
+            try:
+                result = await send()
+            except asyncio.CancelledError:
+                self.observe(endpoint, loop.time() - started)
+                raise
+            self.observe(endpoint, loop.time() - started)
+            return result
+
+        primary = asyncio.ensure_future(attempt())
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done():
+                    if self._tokens >= 1 and may_hedge():
+                        self._tokens -= 1
+                        tasks.append(asyncio.ensure_future(attempt()))
+                    else:
+                        EWITY_HEDGES.labels(endpoint, "skipped").inc()
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            EWITY_HEDGES.labels(endpoint, "won" if task is not primary else "lost").inc()
+                        return task.result()
+            # Every attempt failed: surface the original request's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,126 @@
+"""Customer balance history: compact change-only time series
+
+Sync appends a point only when a customer's outstanding balance or total
+spent changes (and once for new customers), amounts stored as integer
+cents, in the same bulk insert and commit as the page's other writes.
+After each complete sync, `compact_history` downsamples points older than
+`balance_history_raw_days` to the last point per customer per day and
+drops points older than `balance_history_retention_days`, always keeping
+each customer's latest point so old balances can still be answered.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .models import DEFAULT_TENANT, BalanceHistory
+from .tracing import log_event
+
+settings = get_settings()
+
+
+def to_cents(amount: Optional[float]) -> Optional[int]:
+    return None if amount is None else round(amount * 100)
+
+
+def from_cents(cents: Optional[int]) -> Optional[float]:
+    return None if cents is None else cents / 100
+
+
+def record_points(db: Session, changes: List[Dict[str, Any]]) -> None:
+    """Bulk-insert history points for change log rows (not committed here)"""
+    points = [
+        {
+            "tenant_id": change["tenant_id"],
+            "customer_id": change["customer_id"],
+            "recorded_at": change["changed_at"],
+            "outstanding_cents": to_cents(change["new_outstanding"]),
+            "spent_cents": to_cents(change["new_spent"]),
+        }
+        for change in changes
+        if change["kind"] != "removed"
+    ]
+    if points:
+        db.execute(insert(BalanceHistory), points)
+
+
+def compact_history(db: Session) -> Dict[str, int]:
+    """Downsample and expire old history points with set-based DELETEs"""
+    now = datetime.utcnow()
+
+    raw_cutoff = now - timedelta(days=settings.balance_history_raw_days)
+    last_per_day = (
+        select(func.max(BalanceHistory.id))
+        .where(BalanceHistory.recorded_at < raw_cutoff)
+        .group_by(BalanceHistory.tenant_id, BalanceHistory.customer_id, func.date(BalanceHistory.recorded_at))
+    )
+    downsampled = db.execute(
+        delete(BalanceHistory)
+        .where(BalanceHistory.recorded_at < raw_cutoff)
+        .where(BalanceHistory.id.not_in(last_per_day))
+    ).rowcount
+
+    retention_cutoff = now - timedelta(days=settings.balance_history_retention_days)
+    last_per_customer = (
+        select(func.max(BalanceHistory.id))
+        .where(BalanceHistory.recorded_at < retention_cutoff)
+        .group_by(BalanceHistory.tenant_id, BalanceHistory.customer_id)
+    )
+    expired = db.execute(
+        delete(BalanceHistory)
+        .where(BalanceHistory.recorded_at < retention_cutoff)
+        .where(BalanceHistory.id.not_in(last_per_customer))
+    ).rowcount
+
+    db.commit()
+    if downsampled or expired:
+        log_event("balance_history_compacted", downsampled=downsampled, expired=expired)
+    return {"downsampled": downsampled, "expired": expired}
+
+
+def customer_series(
+    db: Session,
+    customer_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    resolution: str = "raw",
+    tenant_id: str = DEFAULT_TENANT
+) -> List[Dict[str, Any]]:
+    """Balance points for a customer, oldest first
+
+    The series starts with the last point before `since` (if any), so the
+    balance in effect at `since` is always known. With resolution="day"
+    only the last point of each day is returned.
+    """
+    query = db.query(BalanceHistory).filter(
+        BalanceHistory.tenant_id == tenant_id,
+        BalanceHistory.customer_id == customer_id
+    )
+    rows = []
+    if since is not None:
+        previous = (
+            query.filter(BalanceHistory.recorded_at < since)
+            .order_by(BalanceHistory.recorded_at.desc(), BalanceHistory.id.desc())
+            .first()
+        )
+        if previous:
+            rows.append(previous)
+        query = query.filter(BalanceHistory.recorded_at >= since)
+    if until is not None:
+        query = query.filter(BalanceHistory.recorded_at <= until)
+    rows.extend(query.order_by(BalanceHistory.recorded_at, BalanceHistory.id).all())
+
+    if resolution == "day":
+        by_day = {}
+        for row in rows:
+            by_day[row.recorded_at.date()] = row
+        rows = list(by_day.values())
+
+    return [
+        {
+            "recorded_at": row.recorded_at,
+            "outstanding_balance": from_cents(row.outstanding_cents),
+            "total_spent": from_cents(row.spent_cents),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,153 @@
+"""Refresh often-scanned customers ahead of their next balance lookup
+
+Each link keeps an access score: the number of scans, decayed with a
+half-life of `access_score_half_life_hours` (stored as a value plus the
+time it was computed, so updating it is one multiply-add). A customer with
+score `s` is due for a refresh when its local row is older than
+`hot_refresh_target_seconds / s` (but at least `hot_refresh_min_seconds`);
+customers below `hot_refresh_min_score` are left to the full sync.
+
+Every `hot_refresh_interval_seconds`, due customers are grouped by their
+cached Ewity page and the pages with the highest total score are
+re-fetched, within `hot_refresh_calls_per_minute` per tenant and never
+once the tenant's upstream budget is degraded. Refreshed rows get
+`hot_refreshed_at`, and the balance routes serve a customer from its
+local row without a synchronous Ewity call only while that stamp is
+younger than `balance_local_fresh_seconds`. Full syncs do not set it, so
+customers the refresher does not keep warm always get a live lookup.
+"""
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .budget import upstream_origin
+from .config import get_settings
+from .database import SessionLocal
+from .ewity_client import CUSTOMER_RESOURCE
+from .models import Customer, CustomerLink
+from .sync_engine import refresh_pages
+from .tenancy import tenant_clients
+from .tracing import log_event
+
+settings = get_settings()
+
+HOT_REFRESH_ORIGIN = "hot_refresh"
+
+
+def decayed_score(score: float, scored_at: Optional[datetime], now: datetime) -> float:
+    """An access score decayed from `scored_at` to `now`"""
+    if not score or scored_at is None:
+        return 0.0
+    age_hours = max((now - scored_at).total_seconds(), 0) / 3600
+    return score * math.pow(0.5, age_hours / settings.access_score_half_life_hours)
+
+
+def record_access(link: CustomerLink, now: datetime) -> None:
+    """Count one scan of a link (not committed)"""
+    link.access_score = decayed_score(link.access_score, link.access_scored_at, now) + 1.0
+    link.access_scored_at = now
+    link.last_accessed = now
+
+
+def refresh_interval(score: float) -> float:
+    """Seconds a customer with this score may go without a refresh"""
+    return max(settings.hot_refresh_target_seconds / score, settings.hot_refresh_min_seconds)
+
+
+def is_fresh(customer: Optional[Customer], now: datetime) -> bool:
+    """True when the hot refresher updated a local row recently enough to serve it without calling Ewity"""
+    return (
+        customer is not None
+        and customer.deleted_at is None
+        and customer.hot_refreshed_at is not None
+        and (now - customer.hot_refreshed_at).total_seconds() < settings.balance_local_fresh_seconds
+    )
+
+
+def due_pages(db: Session, now: datetime) -> Dict[str, List[Tuple[int, float]]]:
+    """Pages worth refreshing per tenant, as (page, total score), hottest first"""
+    rows = (
+        db.query(
+            CustomerLink.tenant_id,
+            CustomerLink.last_api_page,
+            CustomerLink.access_score,
+            CustomerLink.access_scored_at,
+            Customer.synced_at
+        )
+        .join(Customer, (Customer.id == CustomerLink.ewity_customer_id) & (Customer.tenant_id == CustomerLink.tenant_id))
+        .filter(
+            CustomerLink.access_score > 0,
+            CustomerLink.last_api_page.isnot(None),
+            Customer.deleted_at.is_(None)
+        )
+        .all()
+    )
+
+    scores: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+    for tenant_id, page, score, scored_at, synced_at in rows:
+        score = decayed_score(score, scored_at, now)
+        if score < settings.hot_refresh_min_score:
+            continue
+        age = (now - synced_at).total_seconds() if synced_at else math.inf
+        if age >= refresh_interval(score):
+            scores[tenant_id][page] += score
+
+    return {
+        tenant_id: sorted(pages.items(), key=lambda item: item[1], reverse=True)
+        for tenant_id, pages in scores.items()
+    }
+
+
+class HotRefresher:
+    """Background loop re-fetching the pages of hot customers"""
+
+    async def refresh_once(self, db: Session) -> Dict[str, int]:
+        """Refresh due pages for every tenant; returns pages refreshed per tenant"""
+        refreshed = {}
+        for tenant_id, pages in due_pages(db, datetime.utcnow()).items():
+            try:
+                client = tenant_clients.get(tenant_id, db)
+            except KeyError:
+                continue
+            if client.budget.should_degrade():
+                log_event("hot_refresh_skipped", tenant_id=tenant_id, reason="budget", due_pages=len(pages))
+                continue
+
+            # Stay within the refresher's own share of the tenant's calls
+            allowance = int(settings.hot_refresh_calls_per_minute - client.budget.last_60_seconds()[HOT_REFRESH_ORIGIN])
+            selected = [page for page, _ in pages[:max(allowance, 0)]]
+            if not selected:
+                continue
+
+            with upstream_origin(HOT_REFRESH_ORIGIN):
+                result = await refresh_pages(client, db, CUSTOMER_RESOURCE, selected, stamp="hot_refreshed_at")
+            refreshed[tenant_id] = result.get("pages", 0)
+            log_event(
+                "hot_refresh",
+                tenant_id=tenant_id,
+                due_pages=len(pages),
+                pages=result.get("pages", 0),
+                failed=result.get("failed", 0),
+                changed=result.get("changed", 0)
+            )
+        return refreshed
+
+    async def run(self) -> None:
+        """Refresh hot customers until cancelled"""
+        while True:
+            await asyncio.sleep(settings.hot_refresh_interval_seconds)
+            db = SessionLocal()
+            try:
+                await self.refresh_once(db)
+            except Exception as e:
+                log_event("hot_refresh_error", logging.ERROR, error=str(e))
+                db.rollback()
+            finally:
+                db.close()
+
+
+# Global hot customer refresher
+hot_refresher = HotRefresher()
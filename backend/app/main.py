@@ -1,24 +1,38 @@
 """FastAPI main application"""
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .database import engine, Base, SessionLocal
+from .database import SessionLocal, ensure_schema
 from .routers import admin, customer
 from .config import get_settings
 from .models import User
-from .auth import get_password_hash
+from .auth import get_password_hash, verify_metrics_access
+from .ratelimit import RateLimitMiddleware
+from .responses import ORJSONResponse
+from .metrics import MetricsMiddleware, render_metrics
+from .tracing import TracingMiddleware, log_event, setup_logging
+from .profiling import ProfilingMiddleware
+from .budget import track_upstream_origin, upstream_origin
+from .tenancy import ensure_default_tenant, tenant_clients
 
 settings = get_settings()
+setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Create database tables (skipped when the schema is already current)
+    if ensure_schema():
+        log_event("schema_created")
 
     db = SessionLocal()
     try:
+        ensure_default_tenant(db)
+
         # Create default admin user if none exists
         admin_user = db.query(User).filter(User.role == "admin").first()
         if not admin_user:
@@ -29,27 +43,54 @@ async def lifespan(app: FastAPI):
             )
             db.add(default_admin)
             db.commit()
-            print(f"✓ Created default admin user: {settings.admin_username}")
-            print(f"  Change password in production via .env!")
+            log_event(
+                "default_admin_created",
+                logging.WARNING,
+                username=settings.admin_username,
+                note="Change password in production via .env"
+            )
 
-        # Sync customers from Ewity on first start (if customers table is empty)
-        from .models import Customer
+        # Resume interrupted sync jobs, or sync customers from Ewity on first
+        # start (if customers table is empty)
+        from .models import DEFAULT_TENANT, Customer
         from .ewity_client import ewity_client
-
-        customer_count = db.query(Customer).count()
-        if customer_count == 0:
-            print("📥 No customers in local database. Syncing from Ewity...")
-            await ewity_client.sync_all_customers_to_db(db)
+        from .sync_jobs import sync_jobs
+
+        customer_count = db.query(Customer).filter(Customer.tenant_id == DEFAULT_TENANT).count()
+        if sync_jobs.resume_incomplete():
+            log_event("sync_jobs_resuming", customers=customer_count)
+        elif customer_count == 0 and settings.snapshot_import_path and os.path.isfile(settings.snapshot_import_path):
+            # Serve from the snapshot right away and catch up in the background
+            from .snapshot import import_snapshot
+            import_snapshot(settings.snapshot_import_path)
+            sync_jobs.start(db)
+        elif customer_count == 0:
+            log_event("initial_sync", reason="customers table empty")
+            with upstream_origin("startup_sync"):
+                await ewity_client.sync_all_customers_to_db(db)
         else:
-            print(f"✓ Found {customer_count} customers in local database")
+            log_event("customers_loaded", count=customer_count)
 
     finally:
         db.close()
 
+    # Scheduled customer syncs for tenants with a sync interval, and
+    # background refresh of often-scanned customers
+    background_tasks = [asyncio.create_task(sync_jobs.run_schedule())]
+    if settings.hot_refresh_enabled:
+        from .hot_refresh import hot_refresher
+        background_tasks.append(asyncio.create_task(hot_refresher.run()))
+
     yield
 
-    # Shutdown: cleanup if needed
-    print("Shutting down...")
+    # Shutdown: stop sync jobs (they resume from their checkpoint on next start)
+    # and close every tenant's Ewity HTTP client (flushes any cassette)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await sync_jobs.shutdown()
+    await tenant_clients.aclose()
+    log_event("shutdown")
 
 
 # Create FastAPI app
@@ -57,9 +98,27 @@ app = FastAPI(
     title="BLVQ Customer Balance API",
     description="Backend API for BLVQ customer balance PWA",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    dependencies=[Depends(track_upstream_origin)]
 )
 
+# Admin opt-in request profiling. Starlette runs the last-added middleware
+# outermost, so adding this first keeps it inside the rate limiter.
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Rate limiting for public endpoints (added before CORS so rejections still get CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
+# Sampled tracing spans / Server-Timing (inside metrics, outside the rate limiter)
+if settings.tracing_sample_rate > 0:
+    app.add_middleware(TracingMiddleware)
+
+# Request latency metrics (outside the rate limiter so rejections are counted)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -93,3 +152,11 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_metrics_access)])
+    async def metrics():
+        """Prometheus metrics endpoint (METRICS_TOKEN or admin bearer token)"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
@@ -0,0 +1,130 @@
+"""Prometheus metrics for routes, Ewity calls, cache, sync and DB queries
+
+Set PROMETHEUS_MULTIPROC_DIR (to an empty, writable directory) before
+starting several uvicorn workers and /metrics aggregates all of them.
+"""
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HTTP_REQUEST_DURATION = Histogram(
+    "blvq_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+EWITY_REQUESTS = Counter(
+    "blvq_ewity_requests_total",
+    "Upstream Ewity API calls by endpoint, HTTP status and originating route/job",
+    ["endpoint", "status", "origin"],
+)
+
+EWITY_REQUEST_DURATION = Histogram(
+    "blvq_ewity_request_duration_seconds",
+    "Upstream Ewity API call latency by endpoint",
+    ["endpoint"],
+)
+
+EWITY_HEDGES = Counter(
+    "blvq_ewity_hedges_total",
+    "Hedged Ewity GETs by endpoint and outcome (won, lost, skipped by the hedging budget)",
+    ["endpoint", "outcome"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "blvq_cache_lookups_total",
+    "SimpleCache lookups by result",
+    ["result"],
+)
+
+SYNC_DURATION = Histogram(
+    "blvq_sync_duration_seconds",
+    "Full resource sync duration by resource and outcome",
+    ["resource", "outcome"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+SYNC_ROWS = Counter(
+    "blvq_sync_rows_total",
+    "Rows processed by sync by resource and kind (new, updated, changed, removed)",
+    ["resource", "kind"],
+)
+
+DB_QUERY_DURATION = Histogram(
+    "blvq_db_query_duration_seconds",
+    "Database statement latency by operation",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Serialise all metrics in Prometheus text format"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement executed on the engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template to keep UUIDs out of label values
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            ).observe(time.perf_counter() - started)
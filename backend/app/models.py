@@ -1,15 +1,33 @@
 """SQLAlchemy database models"""
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, Text, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
 
+DEFAULT_TENANT = "default"
+
+
 def generate_uuid():
     return str(uuid.uuid4())
 
 
+class Tenant(Base):
+    """A shop with its own Ewity account"""
+    __tablename__ = "tenants"
+
+    id = Column(String, primary_key=True)  # Slug used in URLs, e.g. "default"
+    name = Column(String, nullable=False)
+    ewity_api_token = Column(String, nullable=True)  # None: use EWITY_API_TOKEN (default tenant)
+    ewity_api_base_url = Column(String, nullable=True)  # None: use EWITY_API_BASE_URL
+    sync_interval_minutes = Column(Integer, nullable=True)  # Scheduled customer sync; None disables
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Tenant(id={self.id}, name={self.name})>"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -28,6 +46,7 @@ class CustomerLink(Base):
 
     id = Column(String, primary_key=True, default=generate_uuid)
     uuid = Column(String, unique=True, nullable=False, index=True, default=generate_uuid)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, index=True)
     ewity_customer_id = Column(Integer, nullable=False)
     customer_name = Column(String, nullable=True)  # Cached from Ewity
     customer_phone = Column(String, nullable=True)  # Cached from Ewity
@@ -35,6 +54,9 @@ class CustomerLink(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_accessed = Column(DateTime, default=datetime.utcnow)
     last_api_page = Column(Integer, nullable=True)  # Cache page number for faster lookups
+    customer_missing_at = Column(DateTime, nullable=True)  # Set when a full sync no longer finds the customer
+    access_score = Column(Float, nullable=False, default=0.0)  # Decayed scan count, as of access_scored_at
+    access_scored_at = Column(DateTime, nullable=True)
 
     # Relationships
     created_by_user = relationship("User", back_populates="customer_links")
@@ -43,8 +65,15 @@ class CustomerLink(Base):
 class Customer(Base):
     """Local cache of Ewity customer data"""
     __tablename__ = "customers"
+    # Ewity IDs are only unique within a shop. Top debtors per tenant are
+    # read straight off the outstanding balance index
+    __table_args__ = (
+        PrimaryKeyConstraint("tenant_id", "id"),
+        Index("ix_customers_tenant_outstanding", "tenant_id", "outstanding_balance"),
+    )
 
-    id = Column(Integer, primary_key=True)  # Ewity customer ID
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Ewity customer ID
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
     name = Column(String, nullable=True, index=True)
     mobile = Column(String, nullable=True, index=True)
     email = Column(String, nullable=True)
@@ -52,8 +81,177 @@ class Customer(Base):
     credit_limit = Column(Float, nullable=True)
     total_spent = Column(Float, nullable=True)
     outstanding_balance = Column(Float, nullable=True)
-    data = Column(Text, nullable=True)  # JSON string of full customer data
+    company_name = Column(String, nullable=True)
+    loyalty_points = Column(Float, nullable=True)
+    loyalty_text = Column(String, nullable=True)
+    data = Column(Text, nullable=True)  # JSON string of full customer data (every upstream field)
     synced_at = Column(DateTime, default=datetime.utcnow)
+    hot_refreshed_at = Column(DateTime, nullable=True)  # Last refresh by the hot refresher (full syncs leave it alone)
+    sync_generation = Column(Integer, nullable=True, index=True)  # Generation of the last sync that saw this row
+    deleted_at = Column(DateTime, nullable=True, index=True)  # Tombstone: removed upstream
 
     def __repr__(self):
         return f"<Customer(id={self.id}, name={self.name})>"
+
+
+class CustomerStats(Base):
+    """Dashboard aggregates per tenant, kept up to date by sync"""
+    __tablename__ = "customer_stats"
+
+    tenant_id = Column(String, primary_key=True)
+    customer_count = Column(Integer, nullable=False, default=0)  # Live (not tombstoned) customers
+    outstanding_cents = Column(Integer, nullable=False, default=0)
+    over_limit_count = Column(Integer, nullable=False, default=0)  # Outstanding above credit_limit
+    linked_count = Column(Integer, nullable=False, default=0)  # Live customers with at least one link
+    top_debtors = Column(Text, nullable=True)  # JSON list, highest outstanding first
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EwityUser(Base):
+    """Local mirror of Ewity /users (not the admin users table)"""
+    __tablename__ = "ewity_users"
+    __table_args__ = (PrimaryKeyConstraint("tenant_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Ewity user ID
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
+    username = Column(String, nullable=True)
+    type = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    mobile = Column(String, nullable=True)
+    data = Column(Text, nullable=True)  # JSON string of full upstream record
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    sync_generation = Column(Integer, nullable=True, index=True)
+
+
+class EwityEmployee(Base):
+    """Local mirror of Ewity /employees"""
+    __tablename__ = "ewity_employees"
+    __table_args__ = (PrimaryKeyConstraint("tenant_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
+    name = Column(String, nullable=True)
+    data = Column(Text, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    sync_generation = Column(Integer, nullable=True, index=True)
+
+
+class EwityLocation(Base):
+    """Local mirror of Ewity /locations"""
+    __tablename__ = "ewity_locations"
+    __table_args__ = (PrimaryKeyConstraint("tenant_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
+    name = Column(String, nullable=True)
+    display_name = Column(String, nullable=True)
+    type = Column(String, nullable=True)
+    city = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    data = Column(Text, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    sync_generation = Column(Integer, nullable=True, index=True)
+
+
+class EwityExpense(Base):
+    """Local mirror of Ewity /expenses"""
+    __tablename__ = "ewity_expenses"
+    __table_args__ = (PrimaryKeyConstraint("tenant_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
+    category = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    amount = Column(Float, nullable=True)
+    date = Column(String, nullable=True)  # As returned by Ewity
+    data = Column(Text, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    sync_generation = Column(Integer, nullable=True, index=True)
+
+
+class EwityTag(Base):
+    """Local mirror of Ewity /tags"""
+    __tablename__ = "ewity_tags"
+    __table_args__ = (PrimaryKeyConstraint("tenant_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tenant_id = Column(String, primary_key=True, default=DEFAULT_TENANT)
+    name = Column(String, nullable=True)
+    data = Column(Text, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    sync_generation = Column(Integer, nullable=True, index=True)
+
+
+class CustomerChange(Base):
+    """Append-only log of customer balance changes seen by sync; `id` is the delta cursor"""
+    __tablename__ = "customer_changes"
+    # AUTOINCREMENT: IDs are never reused, even after retention empties the table
+    __table_args__ = (
+        Index("ix_customer_changes_tenant_customer", "tenant_id", "customer_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, index=True)
+    customer_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # new, changed or removed
+    old_outstanding = Column(Float, nullable=True)
+    new_outstanding = Column(Float, nullable=True)
+    old_spent = Column(Float, nullable=True)
+    new_spent = Column(Float, nullable=True)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<CustomerChange(id={self.id}, customer_id={self.customer_id}, kind={self.kind})>"
+
+
+class BalanceHistory(Base):
+    """Customer balance time series: one point per change, amounts in integer cents"""
+    __tablename__ = "balance_history"
+    __table_args__ = (Index("ix_balance_history_tenant_customer_time", "tenant_id", "customer_id", "recorded_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT)
+    customer_id = Column(Integer, nullable=False)
+    recorded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    outstanding_cents = Column(Integer, nullable=True)
+    spent_cents = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<BalanceHistory(customer_id={self.customer_id}, recorded_at={self.recorded_at})>"
+
+
+class SyncJob(Base):
+    """Background resource sync with a persistent page checkpoint"""
+    __tablename__ = "sync_jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    resource = Column(String, nullable=False, default="customers", index=True)  # customers, users, ...
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, index=True)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, running, completed, failed, cancelled
+    next_page = Column(Integer, nullable=False, default=1)  # Checkpoint: first page not yet committed
+    total_pages = Column(Integer, nullable=True)
+    new_count = Column(Integer, nullable=False, default=0)
+    updated_count = Column(Integer, nullable=False, default=0)
+    removed_count = Column(Integer, nullable=False, default=0)
+    generation = Column(Integer, nullable=True)  # Stamped on every row this job sees
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def completed_pages(self) -> int:
+        return self.next_page - 1
+
+    @property
+    def progress(self) -> float:
+        if self.status == "completed":
+            return 1.0
+        if not self.total_pages:
+            return 0.0
+        return round(min(self.completed_pages / self.total_pages, 1.0), 3)
+
+    def __repr__(self):
+        return f"<SyncJob(id={self.id}, status={self.status}, next_page={self.next_page})>"
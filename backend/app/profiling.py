@@ -0,0 +1,114 @@
+"""Opt-in per-request profiling for admins
+
+Send `X-Profile: 1` (or `?profile=1`) together with an admin bearer token and
+that single request is profiled with pyinstrument in async mode, so time
+spent awaiting Ewity calls is attributed to the awaiting code. The profile
+is stored as a speedscope JSON file (open in https://www.speedscope.app)
+and its name is returned in the `X-Profile-Id` response header.
+
+Requests without the switch pay only for one header lookup; pyinstrument
+is imported the first time a profile is actually taken.
+"""
+import os
+import re
+import time
+import uuid
+from typing import Optional
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from .config import get_settings
+from .tracing import log_event
+
+settings = get_settings()
+
+PROFILE_SUFFIX = ".speedscope.json"
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Absolute path of a stored profile, or None for invalid names"""
+    if not re.fullmatch(r"[\w.-]+", name) or not name.endswith(PROFILE_SUFFIX):
+        return None
+    return os.path.join(settings.profile_output_dir, name)
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first"""
+    if not os.path.isdir(settings.profile_output_dir):
+        return []
+    profiles = []
+    for entry in os.scandir(settings.profile_output_dir):
+        if entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            profiles.append({"name": entry.name, "size": stat.st_size, "created": stat.st_mtime})
+    return sorted(profiles, key=lambda p: p["created"], reverse=True)
+
+
+async def is_admin_token(authorization: Optional[str]) -> bool:
+    """Check a bearer token with the same dependencies admin routes use"""
+    from .auth import get_current_admin_user, get_current_user
+    from .database import SessionLocal
+
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=authorization[7:].strip())
+    db = SessionLocal()
+    try:
+        user = await get_current_user(credentials, db)
+        await get_current_admin_user(user)
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry the admin profile switch"""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return value not in (b"", b"0", b"false")
+        query = scope.get("query_string", b"")
+        return b"profile=" in query and parse_qs(query.decode()).get("profile", ["0"])[0] not in ("", "0", "false")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not await is_admin_token(authorization):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        route = re.sub(r"[^\w-]+", "_", scope["path"]).strip("_") or "root"
+        name = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}-"
+            f"{scope['method'].lower()}-{route[:80]}{PROFILE_SUFFIX}"
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        profiler = Profiler(interval=settings.profile_interval_seconds, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            os.makedirs(settings.profile_output_dir, exist_ok=True)
+            with open(os.path.join(settings.profile_output_dir, name), "w") as f:
+                f.write(profiler.output(SpeedscopeRenderer()))
+            log_event("profile_saved", name=name, path=scope["path"])
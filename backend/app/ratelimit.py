@@ -0,0 +1,271 @@
+"""Admission control for public endpoints (rate limiting and load shedding)"""
+import ipaddress
+import json
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from .config import get_settings
+
+settings = get_settings()
+
+# Fixed routes under the customer prefix that are not link UUIDs
+NON_LINK_SEGMENTS = {"batch"}
+
+# Allowance per UUID (36 characters plus quotes, separator and whitespace) when
+# capping a batch body, on top of a fixed allowance for the surrounding JSON
+BATCH_BYTES_PER_UUID = 64
+BATCH_BYTES_OVERHEAD = 1024
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait(self, now: float, count: float = 1) -> float:
+        """Seconds until `count` tokens are available (0 if they are now)
+
+        Counts above the capacity are capped, so a large request is still
+        admitted once the bucket is full.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        count = min(count, self.capacity)
+        if self.tokens >= count:
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+    def take(self, now: float, count: float = 1) -> float:
+        """Take `count` tokens. Returns 0 on success, else seconds until they are available"""
+        retry_after = self.wait(now, count)
+        if not retry_after:
+            self.tokens -= min(count, self.capacity)
+        return retry_after
+
+    def is_idle(self, now: float) -> bool:
+        """True once the bucket would be full again (safe to forget)"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class BucketStore:
+    """Keyed token buckets with pruning of idle entries"""
+
+    def __init__(self, per_minute: int, burst: int, max_keys: int):
+        self._rate = per_minute / 60.0
+        self._burst = burst
+        self._max_keys = max_keys
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self._rate, self._burst)
+        return bucket
+
+    def take(self, key: str, now: float, count: float = 1) -> float:
+        return self._bucket(key, now).take(now, count)
+
+    def take_each(self, keys: List[str], now: float) -> float:
+        """Take one token from every key's bucket, or none if any is empty"""
+        buckets = [self._bucket(key, now) for key in keys]
+        retry_after = max((bucket.wait(now) for bucket in buckets), default=0.0)
+        if not retry_after:
+            for bucket in buckets:
+                bucket.take(now)
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        """Drop idle buckets; if still full, drop the oldest half"""
+        for key in [k for k, b in self._buckets.items() if b.is_idle(now)]:
+            del self._buckets[key]
+        if len(self._buckets) >= self._max_keys:
+            oldest = sorted(self._buckets, key=lambda k: self._buckets[k].updated)
+            for key in oldest[: len(oldest) // 2]:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware guarding public customer routes.
+
+    Applies a per-client-IP and a per-link-UUID token bucket, plus a global
+    limit on concurrently running requests. A batch request pays its first
+    IP token before its body is read, then one more per UUID in the body
+    and one token from each UUID's bucket, and is rejected unless all of
+    them are available; bodies larger than a maximum-size batch get 413.
+    Rejections are answered immediately with 429 (rate limited), 413 or
+    503 (overloaded), without touching the database or Ewity.
+    """
+
+    def __init__(self, app, path_prefix: str = "/api/customer/"):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.batch_path = path_prefix + "batch"
+        self.max_batch_body = settings.balance_batch_max_uuids * BATCH_BYTES_PER_UUID + BATCH_BYTES_OVERHEAD
+        self.trusted_proxies = [
+            ipaddress.ip_network(address.strip(), strict=False)
+            for address in settings.rate_limit_trusted_proxies.split(",")
+            if address.strip()
+        ]
+        self.ip_buckets = BucketStore(
+            settings.rate_limit_ip_per_minute,
+            settings.rate_limit_ip_burst,
+            settings.rate_limit_max_tracked_keys,
+        )
+        self.uuid_buckets = BucketStore(
+            settings.rate_limit_uuid_per_minute,
+            settings.rate_limit_uuid_burst,
+            settings.rate_limit_max_tracked_keys,
+        )
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.rate_limit_enabled
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Long-lived event streams are capped by the broadcaster, not in-flight slots
+        streaming = scope["path"].endswith("/events")
+        if not streaming and self.in_flight >= settings.max_in_flight_requests:
+            await self._reject(send, 503, "Server busy, please retry shortly", 1.0)
+            return
+
+        # Every request pays one IP token before anything else is done for it
+        client_ip = self._client_ip(scope)
+        retry_after = self.ip_buckets.take(client_ip, time.monotonic())
+        if not retry_after:
+            link_uuid = self._link_uuid(scope["path"])
+            link_uuids = [link_uuid] if link_uuid else []
+            extra_ip_tokens = 0
+            if scope["path"] == self.batch_path and scope["method"] == "POST":
+                body = await self._read_body(receive, self.max_batch_body)
+                if body is None:
+                    await self._reject(send, 413, "Request body too large")
+                    return
+                receive = self._replay_body(body, receive)
+                link_uuids = self._batch_uuids(body)
+                # One IP token per UUID in total, capped at the burst
+                extra_ip_tokens = min(len(link_uuids), settings.rate_limit_ip_burst) - 1
+
+            now = time.monotonic()
+            if extra_ip_tokens > 0:
+                retry_after = self.ip_buckets.take(client_ip, now, extra_ip_tokens)
+            if not retry_after:
+                retry_after = self.uuid_buckets.take_each(link_uuids, now)
+        if retry_after:
+            await self._reject(send, 429, "Too many requests", retry_after)
+            return
+
+        if streaming:
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def _link_uuid(self, path: str) -> Optional[str]:
+        """Extract the link UUID from /api/customer/{uuid}[/...]"""
+        rest = path[len(self.path_prefix):]
+        segment = rest.split("/", 1)[0]
+        if not segment or segment in NON_LINK_SEGMENTS:
+            return None
+        return segment
+
+    @staticmethod
+    async def _read_body(receive, limit: int) -> Optional[bytes]:
+        """Read the request body (the app gets it again via _replay_body)
+
+        Returns None as soon as more than `limit` bytes have arrived.
+        """
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                return None
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive):
+        """A receive callable that returns the already-read body first"""
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def replay():
+            if pending:
+                return pending.pop()
+            return await receive()
+        return replay
+
+    @staticmethod
+    def _batch_uuids(body: bytes) -> List[str]:
+        """Distinct UUIDs of a batch request body (empty if it is malformed)"""
+        try:
+            uuids = json.loads(body).get("uuids")
+        except (ValueError, AttributeError):
+            return []
+        if not isinstance(uuids, list):
+            return []
+        return list(dict.fromkeys(uuid for uuid in uuids if isinstance(uuid, str)))
+
+    def _is_trusted_proxy(self, peer: str) -> bool:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def _client_ip(self, scope) -> str:
+        """Client IP, honouring Cloudflare/proxy headers sent by a trusted proxy
+
+        Any client can set these headers, so they are only believed when the
+        connection itself comes from a configured proxy address.
+        """
+        client: Optional[Tuple[str, int]] = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if settings.rate_limit_trust_proxy_headers and self._is_trusted_proxy(peer):
+            headers = dict(scope.get("headers") or [])
+            forwarded = headers.get(b"cf-connecting-ip") or headers.get(b"x-forwarded-for")
+            if forwarded:
+                return forwarded.decode("latin-1").split(",", 1)[0].strip()
+        return peer
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str, retry_after: Optional[float] = None) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode()))
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,43 @@
+"""Fast JSON responses and cached serialised payloads"""
+from typing import Any, Callable, Dict, Tuple
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (also accepts orjson.Fragment values)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class PayloadCache:
+    """Pre-serialised JSON fragments per customer row.
+
+    Entries are keyed by tenant, customer ID and payload kind, and are only
+    dropped when the sync pipeline reports that the row's upstream data
+    changed, so repeated reads of unchanged rows skip dict building and
+    encoding.
+    """
+
+    def __init__(self):
+        self._payloads: Dict[Tuple[str, int], Dict[str, orjson.Fragment]] = {}
+
+    def fragment(self, kind: str, tenant_id: str, customer_id: int, build: Callable[[], Any]) -> orjson.Fragment:
+        """Get the cached fragment, serialising `build()` on a miss"""
+        entries = self._payloads.setdefault((tenant_id, customer_id), {})
+        payload = entries.get(kind)
+        if payload is None:
+            payload = entries[kind] = orjson.Fragment(orjson.dumps(build()))
+        return payload
+
+    def invalidate(self, tenant_id: str, customer_id: int) -> None:
+        """Drop all payloads for a customer (called when sync changes the row)"""
+        self._payloads.pop((tenant_id, customer_id), None)
+
+    def clear(self) -> None:
+        self._payloads.clear()
+
+
+# Global payload cache instance
+payload_cache = PayloadCache()
@@ -1,16 +1,29 @@
 """Admin API endpoints"""
-from datetime import timedelta
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+import tempfile
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..models import User, CustomerLink
+from ..models import DEFAULT_TENANT, User, Customer, CustomerLink, CustomerChange, SyncJob, Tenant
 from ..schemas import (
     AdminLogin,
     Token,
+    TenantCreate,
+    TenantResponse,
     CustomerLinkCreate,
     CustomerLinkResponse,
-    EwityCustomer
+    EwityCustomer,
+    EwityCustomerDetail,
+    CustomerChangeResponse,
+    CustomerChangesResponse,
+    DashboardResponse,
+    BalanceHistoryResponse,
+    SyncJobResponse
 )
 from ..auth import (
     verify_password,
@@ -18,7 +31,16 @@ from ..auth import (
     get_current_admin_user,
     get_password_hash
 )
-from ..ewity_client import ewity_client
+from ..ewity_client import customer_row_to_dict, customer_search_dict, search_pagination
+from ..responses import ORJSONResponse, payload_cache
+from ..dashboard import dashboard, refresh_linked
+from ..history import customer_series
+from ..export import export_filename, stream_customers
+from ..snapshot import import_snapshot
+from ..profiling import list_profiles, profile_path
+from ..sync_jobs import sync_jobs
+from ..tenancy import get_tenant_id, tenant_clients
+from ..sync_engine import MIRRORED_RESOURCES
 from ..config import get_settings
 
 settings = get_settings()
@@ -51,10 +73,72 @@ async def login(credentials: AdminLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+def tenant_response(tenant: Tenant) -> TenantResponse:
+    return TenantResponse(
+        id=tenant.id,
+        name=tenant.name,
+        has_token=bool(tenant.ewity_api_token),
+        ewity_api_base_url=tenant.ewity_api_base_url,
+        sync_interval_minutes=tenant.sync_interval_minutes,
+        created_at=tenant.created_at
+    )
+
+
+@router.get("/tenants", response_model=List[TenantResponse])
+async def get_tenants(
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """List shops (tenants)"""
+    return [tenant_response(tenant) for tenant in db.query(Tenant).order_by(Tenant.created_at).all()]
+
+
+@router.put("/tenants/{tenant_id}", response_model=TenantResponse)
+async def put_tenant(
+    tenant_id: str,
+    tenant_data: TenantCreate,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Create or update a shop and its Ewity credentials
+
+    Pass `?tenant=<id>` to the other admin endpoints to work on this shop.
+    A token left empty keeps the stored one.
+    """
+    if tenant_data.id != tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tenant ID in body does not match the URL"
+        )
+
+    tenant = db.get(Tenant, tenant_id)
+    if not tenant:
+        # Only the default tenant may fall back to EWITY_API_TOKEN
+        if tenant_id != DEFAULT_TENANT and not tenant_data.ewity_api_token:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ewity_api_token is required for a new tenant"
+            )
+        tenant = Tenant(id=tenant_id)
+        db.add(tenant)
+    tenant.name = tenant_data.name
+    if tenant_data.ewity_api_token:
+        tenant.ewity_api_token = tenant_data.ewity_api_token
+    tenant.ewity_api_base_url = tenant_data.ewity_api_base_url
+    tenant.sync_interval_minutes = tenant_data.sync_interval_minutes
+    db.commit()
+    db.refresh(tenant)
+
+    # Pick up the new credentials on next use
+    await tenant_clients.reset(tenant_id)
+    return tenant_response(tenant)
+
+
 @router.get("/customers/search", response_model=dict)
 async def search_customers(
     q: str,
     page: int = 1,
+    tenant_id: str = Depends(get_tenant_id),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
@@ -65,29 +149,40 @@ async def search_customers(
             detail="Query must be at least 2 characters"
         )
 
-    result = await ewity_client.search_customers(q, page, db)
-    return result
+    # Serve pre-serialised rows; they are only re-encoded after sync changes them
+    page_size = 20
+    rows, total = tenant_clients.get(tenant_id, db).search_customer_rows(q, page, db, page_size)
+    return ORJSONResponse({
+        "data": [
+            payload_cache.fragment("search", tenant_id, customer.id, lambda customer=customer: customer_search_dict(customer))
+            for customer in rows
+        ],
+        "pagination": search_pagination(total, page, page_size)
+    })
 
 
 @router.get("/customers/all", response_model=dict)
 async def get_all_customers(
     page: int = 1,
+    tenant_id: str = Depends(get_tenant_id),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Get all Ewity customers (paginated)"""
-    result = await ewity_client.get_all_customers(page)
+    result = await tenant_clients.get(tenant_id).get_all_customers(page)
     return result
 
 
 @router.post("/customers/link", response_model=CustomerLinkResponse)
 async def link_customer(
     link_data: CustomerLinkCreate,
+    tenant_id: str = Depends(get_tenant_id),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Link a customer to a UUID for balance checking"""
     # Check if customer already linked
     existing = db.query(CustomerLink).filter(
+        CustomerLink.tenant_id == tenant_id,
         CustomerLink.ewity_customer_id == link_data.ewity_customer_id
     ).first()
 
@@ -99,6 +194,7 @@ async def link_customer(
 
     # Create new link
     new_link = CustomerLink(
+        tenant_id=tenant_id,
         ewity_customer_id=link_data.ewity_customer_id,
         customer_name=link_data.customer_name,
         customer_phone=link_data.customer_phone,
@@ -106,6 +202,8 @@ async def link_customer(
     )
 
     db.add(new_link)
+    db.flush()
+    refresh_linked(db, tenant_id)
     db.commit()
     db.refresh(new_link)
 
@@ -114,14 +212,184 @@ async def link_customer(
 
 @router.get("/customers/links", response_model=List[CustomerLinkResponse])
 async def get_customer_links(
+    tenant_id: str = Depends(get_tenant_id),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get all linked customers"""
-    links = db.query(CustomerLink).order_by(CustomerLink.created_at.desc()).all()
+    links = (
+        db.query(CustomerLink)
+        .filter(CustomerLink.tenant_id == tenant_id)
+        .order_by(CustomerLink.created_at.desc())
+        .all()
+    )
     return links
 
 
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Customer totals, over-limit count, linked/unlinked counts and top debtors
+
+    Maintained by sync as rows change, so this is a single-row read.
+    """
+    return dashboard(db, tenant_id)
+
+
+@router.get("/customers/changes", response_model=CustomerChangesResponse)
+async def get_customer_changes(
+    since: int = 0,
+    limit: int = 500,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Balance changes recorded by sync after the `since` cursor
+
+    Pass the returned `next_cursor` as `since` on the next call to pull only
+    new changes; keep paging while `has_more` is true.
+    """
+    limit = max(1, min(limit, 5000))
+    rows = (
+        db.query(CustomerChange)
+        .filter(CustomerChange.tenant_id == tenant_id, CustomerChange.id > since)
+        .order_by(CustomerChange.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return CustomerChangesResponse(
+        changes=[
+            CustomerChangeResponse(
+                cursor=row.id,
+                customer_id=row.customer_id,
+                kind=row.kind,
+                old_outstanding=row.old_outstanding,
+                new_outstanding=row.new_outstanding,
+                old_spent=row.old_spent,
+                new_spent=row.new_spent,
+                changed_at=row.changed_at
+            )
+            for row in rows
+        ],
+        next_cursor=rows[-1].id if rows else since,
+        has_more=has_more
+    )
+
+
+@router.get("/export/customers")
+async def export_customers(
+    format: str = "csv",
+    links: bool = False,
+    include_deleted: bool = False,
+    gzip: bool = False,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Stream the local customers table as CSV or NDJSON
+
+    `links=true` adds one row per customer link (uuid, created, last
+    accessed); `gzip=true` returns a .gz file compressed on the fly.
+    """
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be 'csv' or 'ndjson'"
+        )
+
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(
+        stream_customers(format, links, include_deleted, gzip, tenant_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{tenant_id}-{export_filename(format, gzip)}"'}
+    )
+
+
+@router.post("/import/snapshot")
+async def import_customer_snapshot(
+    file: UploadFile = File(...),
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk-load a customers snapshot (NDJSON export or SQLite backup)
+
+    Rows are loaded into the selected tenant (from a SQLite backup, only
+    that tenant's rows). Existing rows with the same ID/UUID are updated. A
+    background sync job is started afterwards to catch up with Ewity.
+    """
+    with tempfile.NamedTemporaryFile(prefix="blvq-snapshot-") as tmp:
+        while chunk := await file.read(1024 * 1024):
+            tmp.write(chunk)
+        tmp.flush()
+        try:
+            result = await run_in_threadpool(import_snapshot, tmp.name, tenant_id)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not import snapshot: {e}"
+            )
+
+    payload_cache.clear()
+    job = sync_jobs.start(db, tenant_id=tenant_id)
+    return {"import": result, "sync_job": SyncJobResponse.model_validate(job)}
+
+
+@router.get("/customers/{customer_id}", response_model=EwityCustomerDetail)
+async def get_customer_detail(
+    customer_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Full Ewity customer record from the local copy (no upstream call)"""
+    customer = db.query(Customer).filter(
+        Customer.id == customer_id,
+        Customer.tenant_id == tenant_id,
+        Customer.deleted_at.is_(None)
+    ).first()
+
+    if not customer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Customer not found"
+        )
+
+    return customer_row_to_dict(customer)
+
+
+@router.get("/customers/{customer_id}/history", response_model=BalanceHistoryResponse)
+async def get_customer_history(
+    customer_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    resolution: str = "raw",
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Balance history of an Ewity customer (resolution: raw or day)
+
+    The first point is the balance in effect at `since`.
+    """
+    if resolution not in ("raw", "day"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="resolution must be 'raw' or 'day'"
+        )
+
+    return BalanceHistoryResponse(
+        customer_id=customer_id,
+        resolution=resolution,
+        points=customer_series(db, customer_id, since, until, resolution, tenant_id)
+    )
+
+
 @router.delete("/customers/link/{uuid}")
 async def delete_customer_link(
     uuid: str,
@@ -138,16 +406,173 @@ async def delete_customer_link(
         )
 
     db.delete(link)
+    db.flush()
+    refresh_linked(db, link.tenant_id)
     db.commit()
 
     return {"message": "Link deleted successfully"}
 
 
-@router.post("/customers/refresh")
+@router.post(
+    "/customers/refresh",
+    response_model=SyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
 async def refresh_customer_data(
+    tenant_id: str = Depends(get_tenant_id),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Manually trigger refresh of customer data from Ewity API"""
-    result = await ewity_client.sync_all_customers_to_db(db)
-    return result
+    """Start a background refresh of customer data from Ewity API
+
+    Returns the sync job immediately (or the one already in progress); poll
+    /sync/jobs/{job_id} for progress.
+    """
+    return sync_jobs.start(db, tenant_id=tenant_id)
+
+
+def get_mirrored_resource_or_404(resource: str):
+    spec = MIRRORED_RESOURCES.get(resource)
+
+    if not spec:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown resource. Available: {', '.join(MIRRORED_RESOURCES)}"
+        )
+
+    return spec
+
+
+@router.post(
+    "/sync/resources/{resource}",
+    response_model=SyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def refresh_resource(
+    resource: str,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Start a background sync of another Ewity resource (users, locations, ...)"""
+    get_mirrored_resource_or_404(resource)
+    return sync_jobs.start(db, resource, tenant_id)
+
+
+@router.get("/resources/{resource}", response_model=dict)
+async def get_resource_rows(
+    resource: str,
+    page: int = 1,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Locally mirrored rows of an Ewity resource (no upstream call)"""
+    spec = get_mirrored_resource_or_404(resource)
+    page_size = 20
+    query = db.query(spec.model).filter(spec.model.tenant_id == tenant_id)
+    total = query.count()
+    rows = query.order_by(spec.model.id).offset((max(page, 1) - 1) * page_size).limit(page_size).all()
+    return {
+        "data": [json.loads(row.data) for row in rows],
+        "pagination": search_pagination(total, page, page_size)
+    }
+
+
+def get_sync_job_or_404(job_id: str, db: Session) -> SyncJob:
+    job = db.get(SyncJob, job_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sync job not found"
+        )
+
+    return job
+
+
+@router.get("/sync/jobs", response_model=List[SyncJobResponse])
+async def get_sync_jobs(
+    limit: int = 20,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """List recent sync jobs"""
+    return (
+        db.query(SyncJob)
+        .filter(SyncJob.tenant_id == tenant_id)
+        .order_by(SyncJob.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/sync/jobs/{job_id}", response_model=SyncJobResponse)
+async def get_sync_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get progress of a sync job"""
+    return get_sync_job_or_404(job_id, db)
+
+
+@router.post("/sync/jobs/{job_id}/cancel", response_model=SyncJobResponse)
+async def cancel_sync_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a sync job after its current page (progress so far is kept)"""
+    return sync_jobs.cancel(db, get_sync_job_or_404(job_id, db))
+
+
+@router.post("/sync/jobs/{job_id}/resume", response_model=SyncJobResponse)
+async def resume_sync_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Resume a failed or cancelled sync job from its checkpoint"""
+    job = get_sync_job_or_404(job_id, db)
+
+    if job.status == "completed":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sync job already completed"
+        )
+
+    return sync_jobs.resume(db, job)
+
+
+@router.get("/upstream/usage")
+async def get_upstream_usage(
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Rolling Ewity call totals per originating route/job against the tenant's budget"""
+    return tenant_clients.get(tenant_id).budget.summary()
+
+
+@router.get("/profiles")
+async def get_profiles(current_user: User = Depends(get_current_admin_user)):
+    """List stored request profiles (taken with the X-Profile header)"""
+    return list_profiles()
+
+
+@router.get("/profiles/{name}")
+async def download_profile(
+    name: str,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download a stored request profile (speedscope JSON)"""
+    path = profile_path(name)
+
+    if not path or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+
+    return FileResponse(path, media_type="application/json", filename=name)
@@ -1,25 +1,230 @@
 """Customer API endpoints (public)"""
+import asyncio
+import hashlib
+import json
+import logging
 from datetime import datetime
 from io import BytesIO
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-import qrcode
 from ..database import get_db
-from ..models import CustomerLink
-from ..schemas import CustomerBalanceResponse
-from ..ewity_client import ewity_client
+from ..models import Customer, CustomerLink
+from ..schemas import (
+    CustomerBalanceResponse,
+    CustomerBalanceBatchRequest,
+    CustomerBalanceBatchResponse
+)
+from ..ewity_client import EwityClient, customer_row_to_dict
+from ..events import balance_events, balance_snapshot, format_sse
+from ..hot_refresh import is_fresh, record_access
+from ..tenancy import tenant_clients
+from ..tracing import log_event, span
 from ..config import get_settings
 
 settings = get_settings()
 router = APIRouter(prefix="/api/customer", tags=["customer"])
 
 
+def balance_etag(balance: CustomerBalanceResponse) -> str:
+    """Stable ETag over the balance fields (excludes the last_updated timestamp)"""
+    payload = balance.model_dump_json(exclude={"last_updated"})
+    return f'W/"{hashlib.sha1(payload.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def json_model_response(model: BaseModel, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Return a pydantic model as a JSON response, serialised by pydantic-core"""
+    return Response(
+        content=model.__pydantic_serializer__.to_json(model),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def build_balance_response(
+    link: CustomerLink,
+    customer_data: Dict[str, Any],
+    last_updated: datetime
+) -> CustomerBalanceResponse:
+    """Build the public balance response for a link from Ewity customer data"""
+    return CustomerBalanceResponse(
+        uuid=link.uuid,
+        customer_name=customer_data.get("name", link.customer_name or "Unknown"),
+        customer_phone=customer_data.get("mobile", link.customer_phone),
+        credit_limit=customer_data.get("credit_limit", 0) or 0,
+        total_outstanding=customer_data.get("total_outstanding", 0) or 0,
+        total_spent=customer_data.get("total_spent", 0) or 0,
+        loyalty_text=customer_data.get("loyalty_text"),
+        loyalty_points=customer_data.get("loyalty_points"),
+        company_name=customer_data.get("company_name"),
+        last_updated=last_updated
+    )
+
+
+async def fetch_live_customers(
+    client: EwityClient,
+    links: List[CustomerLink],
+    live: Dict[Tuple[str, int], Dict[str, Any]],
+    found_pages: Dict[Tuple[str, int], int]
+) -> None:
+    """Find one tenant's linked customers in Ewity, fetching each page at most once
+
+    Cached pages are fetched first, then at most `balance_batch_scan_pages`
+    further pages while customers are still missing; anyone not found by
+    then is served from the local row or reported as not found. Results are
+    added to `live` and `found_pages`, keyed by (tenant, customer ID).
+    """
+    tenant_id = client.tenant_id
+    wanted = {link.ewity_customer_id for link in links}
+    found = set()
+    fetched_pages = set()
+
+    async def fetch_pages(pages) -> Optional[int]:
+        """Fetch pages concurrently, record wanted customers, return lastPage"""
+        results = await asyncio.gather(
+            *(client._get("/customers", params={"page": page}) for page in pages)
+        )
+        fetched_pages.update(pages)
+        last_page = None
+        for page, data in zip(pages, results):
+            last_page = data.get("pagination", {}).get("lastPage", last_page)
+            for c in data.get("data", []):
+                if c.get("id") in wanted:
+                    found.add(c["id"])
+                    live[tenant_id, c["id"]] = c
+                    found_pages[tenant_id, c["id"]] = page
+        return last_page
+
+    cached_pages = sorted({link.last_api_page for link in links if link.last_api_page})
+    last_page = await fetch_pages(cached_pages) if cached_pages else None
+
+    # Scan the remaining pages one at a time until everyone is found or the budget is spent
+    page = 1
+    scan_budget = settings.balance_batch_scan_pages
+    while wanted - found and page <= (last_page or page):
+        if page not in fetched_pages:
+            if scan_budget <= 0:
+                log_event("batch_scan_budget_spent", tenant_id=tenant_id, missing=len(wanted - found))
+                break
+            scan_budget -= 1
+            last_page = await fetch_pages([page]) or last_page
+        page += 1
+
+
+@router.post("/batch", response_model=CustomerBalanceBatchResponse)
+async def get_customer_balances(batch: CustomerBalanceBatchRequest, db: Session = Depends(get_db)):
+    """Get balances for several customer UUIDs at once (public endpoint)
+
+    Links and local customer rows are loaded with one query each. Customers
+    with a freshly synced local row are served from it; for the rest every
+    Ewity page is fetched at most once per tenant for the whole batch.
+    """
+    uuids = list(dict.fromkeys(batch.uuids))
+    if len(uuids) > settings.balance_batch_max_uuids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.balance_batch_max_uuids} UUIDs per request"
+        )
+
+    links = db.query(CustomerLink).filter(CustomerLink.uuid.in_(uuids)).all() if uuids else []
+    links_by_uuid = {link.uuid: link for link in links}
+
+    now = datetime.utcnow()
+    for link in links:
+        record_access(link, now)
+
+    # Local rows, keyed by (tenant, customer ID): served directly when fresh, else the fallback
+    wanted = {(link.tenant_id, link.ewity_customer_id) for link in links}
+    local = {}
+    if wanted:
+        rows = db.query(Customer).filter(
+            tuple_(Customer.tenant_id, Customer.id).in_(wanted),
+            Customer.deleted_at.is_(None)
+        ).all()
+        local = {(row.tenant_id, row.id): row for row in rows}
+    fresh = {key for key, row in local.items() if is_fresh(row, now)}
+
+    # Fresh data from Ewity, keyed by (tenant, customer ID), one client per tenant
+    live: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    found_pages: Dict[Tuple[str, int], int] = {}
+
+    links_by_tenant: Dict[str, List[CustomerLink]] = {}
+    for link in links:
+        if (link.tenant_id, link.ewity_customer_id) not in fresh:
+            links_by_tenant.setdefault(link.tenant_id, []).append(link)
+
+    for tenant_id, tenant_links in links_by_tenant.items():
+        client = tenant_clients.get(tenant_id, db)
+        # Near the tenant's upstream budget, serve its links from the local database
+        if client.budget.should_degrade():
+            log_event("batch_budget_degraded", tenant_id=tenant_id, links=len(tenant_links))
+            continue
+        try:
+            await fetch_live_customers(client, tenant_links, live, found_pages)
+        except Exception as e:
+            log_event("batch_upstream_error", logging.WARNING, tenant_id=tenant_id, error=str(e))
+
+    for link in links:
+        found_page = found_pages.get((link.tenant_id, link.ewity_customer_id))
+        if found_page and found_page != link.last_api_page:
+            link.last_api_page = found_page
+    db.commit()
+
+    # Local rows for anyone fresh or not found upstream
+    local = {key: customer_row_to_dict(row) for key, row in local.items() if key not in live}
+
+    balances = []
+    not_found = []
+    for uuid in uuids:
+        link = links_by_uuid.get(uuid)
+        customer_data = None
+        if link:
+            key = (link.tenant_id, link.ewity_customer_id)
+            customer_data = live.get(key)
+            last_updated = now
+            if customer_data:
+                balance_events.publish(link.tenant_id, link.ewity_customer_id, customer_data)
+            else:
+                customer_data = local.get(key)
+                last_updated = customer_data and customer_data.get("synced_at") or now
+        if not customer_data:
+            not_found.append(uuid)
+            continue
+        balances.append(build_balance_response(link, customer_data, last_updated))
+
+    return json_model_response(CustomerBalanceBatchResponse(balances=balances, not_found=not_found))
+
+
 @router.get("/{uuid}", response_model=CustomerBalanceResponse)
-async def get_customer_balance(uuid: str, db: Session = Depends(get_db)):
-    """Get customer balance by UUID (public endpoint)"""
+async def get_customer_balance(
+    uuid: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Get customer balance by UUID (public endpoint)
+
+    Responses carry an ETag derived from the balance fields, so clients can
+    revalidate with If-None-Match and receive 304 when nothing changed.
+    """
     # Find the link
-    link = db.query(CustomerLink).filter(CustomerLink.uuid == uuid).first()
+    with span("link_query"):
+        link = db.query(CustomerLink).filter(CustomerLink.uuid == uuid).first()
 
     if not link:
         raise HTTPException(
@@ -27,62 +232,92 @@ async def get_customer_balance(uuid: str, db: Session = Depends(get_db)):
             detail="Customer not found"
         )
 
-    # Update last accessed
-    link.last_accessed = datetime.utcnow()
-    db.commit()
+    # Update last accessed and the access score
+    now = datetime.utcnow()
+    with span("last_accessed_commit"):
+        record_access(link, now)
+        db.commit()
 
-    # Fetch FRESH customer data directly from Ewity API (bypass database cache)
-    # Use cached page number for faster lookup
+    customer_id = link.ewity_customer_id
     customer_data = None
     found_page = None
+    client = tenant_clients.get(link.tenant_id, db)
 
-    try:
-        # If we have a cached page number, check that page first
-        if link.last_api_page:
-            print(f"Checking cached page {link.last_api_page} for customer {link.ewity_customer_id}")
-            data = await ewity_client._get("/customers", params={"page": link.last_api_page})
-            customers = data.get("data", [])
-
-            for c in customers:
-                if c.get("id") == link.ewity_customer_id:
-                    customer_data = c
-                    found_page = link.last_api_page
-                    print(f"✓ Found on cached page {found_page}")
-                    break
+    # Hot customers are kept fresh in the background; serve a recent local row as is
+    with span("local_fresh_check"):
+        local = db.query(Customer).filter(
+            Customer.id == customer_id, Customer.tenant_id == link.tenant_id
+        ).first()
+    from_fresh_local = is_fresh(local, now)
+    if from_fresh_local:
+        customer_data = customer_row_to_dict(local)
 
-        # If not found on cached page, search all pages
-        if not customer_data:
-            print(f"Customer not on cached page, searching all pages...")
-            for page in range(1, 14):
-                # Skip the cached page since we already checked it
-                if page == link.last_api_page:
-                    continue
+    # Otherwise fetch FRESH customer data directly from Ewity API, using the
+    # cached page number for faster lookup. Near the upstream budget, skip
+    # Ewity and serve local data.
+    degraded = not from_fresh_local and client.budget.should_degrade()
+    if degraded:
+        log_event("balance_budget_degraded", customer_id=customer_id)
 
-                data = await ewity_client._get("/customers", params={"page": page})
+    try:
+        # If we have a cached page number, check that page first
+        if link.last_api_page and not customer_data and not degraded:
+            with span("cached_page_probe"):
+                data = await client._get("/customers", params={"page": link.last_api_page})
                 customers = data.get("data", [])
 
                 for c in customers:
-                    if c.get("id") == link.ewity_customer_id:
+                    if c.get("id") == customer_id:
                         customer_data = c
-                        found_page = page
-                        print(f"✓ Found customer on page {page}")
+                        found_page = link.last_api_page
                         break
 
-                if customer_data:
-                    break
+        # If not found on cached page, search all pages
+        if not customer_data and not degraded:
+            log_event("balance_page_scan", customer_id=customer_id, cached_page=link.last_api_page)
+            with span("page_scan"):
+                for page in range(1, 14):
+                    # Skip the cached page since we already checked it
+                    if page == link.last_api_page:
+                        continue
+
+                    data = await client._get("/customers", params={"page": page})
+                    customers = data.get("data", [])
+
+                    for c in customers:
+                        if c.get("id") == customer_id:
+                            customer_data = c
+                            found_page = page
+                            break
+
+                    if customer_data:
+                        break
 
         # Update cached page number if found
         if found_page and found_page != link.last_api_page:
-            link.last_api_page = found_page
-            print(f"Updated cached page to {found_page}")
+            with span("page_cache_commit"):
+                link.last_api_page = found_page
+                db.commit()
+            log_event("balance_page_cached", customer_id=customer_id, page=found_page)
 
     except Exception as e:
-        print(f"Error fetching fresh data: {e}")
+        log_event("balance_upstream_error", logging.WARNING, customer_id=customer_id, error=str(e))
+
+    # Data fetched from the API is fresh as of now
+    last_updated = datetime.utcnow()
+    from_live_api = customer_data is not None and not from_fresh_local
+    if from_live_api:
+        balance_events.publish(link.tenant_id, customer_id, customer_data)
+    elif from_fresh_local:
+        last_updated = local.synced_at
 
     # Final fallback to database if API search fails
     if not customer_data:
-        print(f"Could not find in API, using database cache")
-        customer_data = await ewity_client.get_customer(link.ewity_customer_id, db)
+        log_event("balance_db_fallback", customer_id=customer_id)
+        with span("db_fallback"):
+            customer_data = await client.get_customer(customer_id, db)
+        if customer_data and customer_data.get("synced_at"):
+            last_updated = customer_data["synced_at"]
 
     if not customer_data:
         raise HTTPException(
@@ -91,15 +326,73 @@ async def get_customer_balance(uuid: str, db: Session = Depends(get_db)):
         )
 
     # Return balance info
-    return CustomerBalanceResponse(
-        uuid=link.uuid,
-        customer_name=customer_data.get("name", link.customer_name or "Unknown"),
-        customer_phone=customer_data.get("mobile", link.customer_phone),
-        credit_limit=customer_data.get("credit_limit", 0) or 0,
-        total_outstanding=customer_data.get("total_outstanding", 0) or 0,
-        total_spent=customer_data.get("total_spent", 0) or 0,
-        loyalty_text=customer_data.get("loyalty_text"),
-        last_updated=datetime.utcnow()
+    balance = build_balance_response(link, customer_data, last_updated)
+
+    # Live (or freshly refreshed) data may be reused briefly; database
+    # fallback data is already stale so clients must revalidate every time
+    if from_live_api or from_fresh_local:
+        cache_control = f"private, max-age={settings.balance_max_age_seconds}"
+    else:
+        cache_control = "private, no-cache"
+
+    etag = balance_etag(balance)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Already validated; serialise once and skip response_model re-validation
+    return json_model_response(balance, headers)
+
+
+@router.get("/{uuid}/events")
+async def stream_customer_balance(uuid: str, request: Request, db: Session = Depends(get_db)):
+    """Stream live balance updates for a customer UUID as Server-Sent Events
+
+    Sends the locally known balance immediately, then a `balance` event only
+    when the customer's outstanding balance or total spent changes.
+    """
+    link = db.query(CustomerLink).filter(CustomerLink.uuid == uuid).first()
+
+    if not link:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Customer not found"
+        )
+
+    if balance_events.connections >= settings.sse_max_connections:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections",
+            headers={"Retry-After": str(settings.sse_heartbeat_seconds)}
+        )
+
+    # Resolve everything from the DB up front so the stream holds no session
+    customer_id, tenant_id = link.ewity_customer_id, link.tenant_id
+    customer_data = await tenant_clients.get(tenant_id, db).get_customer(customer_id, db) or {
+        "name": link.customer_name,
+        "mobile": link.customer_phone,
+    }
+    initial = format_sse(
+        "balance",
+        json.dumps(balance_snapshot(customer_data, customer_data.get("synced_at")))
+    )
+
+    async def event_stream():
+        queue = balance_events.subscribe(tenant_id, customer_id, customer_data)
+        try:
+            yield initial
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            balance_events.unsubscribe(tenant_id, customer_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -115,7 +408,9 @@ async def get_qr_code(uuid: str, db: Session = Depends(get_db)):
             detail="Customer not found"
         )
 
-    # Generate QR code
+    # Generate QR code (qrcode/PIL are only loaded once a QR code is requested)
+    import qrcode
+
     url = f"{settings.frontend_url}/balance/{uuid}"
 
     qr = qrcode.QRCode(
@@ -1,7 +1,7 @@
 """Pydantic schemas for request/response validation"""
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
 
 
 # Auth schemas
@@ -19,6 +19,24 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 
+# Tenant schemas
+class TenantCreate(BaseModel):
+    id: str = Field(pattern=r"^[a-z0-9][a-z0-9_-]*$", max_length=64)
+    name: str
+    ewity_api_token: Optional[str] = None
+    ewity_api_base_url: Optional[str] = None
+    sync_interval_minutes: Optional[int] = Field(default=None, ge=1)
+
+
+class TenantResponse(BaseModel):
+    id: str
+    name: str
+    has_token: bool  # The token itself is never returned
+    ewity_api_base_url: Optional[str]
+    sync_interval_minutes: Optional[int]
+    created_at: datetime
+
+
 # Customer link schemas
 class CustomerLinkCreate(BaseModel):
     ewity_customer_id: int
@@ -29,11 +47,13 @@ class CustomerLinkCreate(BaseModel):
 class CustomerLinkResponse(BaseModel):
     id: str
     uuid: str
+    tenant_id: str
     ewity_customer_id: int
     customer_name: Optional[str]
     customer_phone: Optional[str]
     created_at: datetime
     last_accessed: datetime
+    customer_missing_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -51,6 +71,23 @@ class EwityCustomer(BaseModel):
     loyalty_text: Optional[str]
 
 
+class EwityCustomerDetail(EwityCustomer):
+    """Every documented Ewity customer field, served from the local copy"""
+    company_name: Optional[str] = None
+    address: Optional[str] = None
+    birthday: Any = None
+    passport: Any = None
+    bill_note: Any = None
+    price_level: Any = None
+    tax_number: Any = None
+    note: Any = None
+    loyalty_points: Optional[float] = None
+    loyalty_text_extra: Any = None
+    loyalty_program: Any = None
+    created_unix: Optional[int] = None
+    synced_at: Optional[datetime] = None
+
+
 class CustomerBalanceResponse(BaseModel):
     uuid: str
     customer_name: str
@@ -59,4 +96,82 @@ class CustomerBalanceResponse(BaseModel):
     total_outstanding: float
     total_spent: float
     loyalty_text: Optional[str]
+    loyalty_points: Optional[float] = None
+    company_name: Optional[str] = None
     last_updated: datetime
+
+
+class CustomerBalanceBatchRequest(BaseModel):
+    uuids: List[str]
+
+
+class CustomerBalanceBatchResponse(BaseModel):
+    balances: List[CustomerBalanceResponse]
+    not_found: List[str]
+
+
+class CustomerChangeResponse(BaseModel):
+    cursor: int
+    customer_id: int
+    kind: str
+    old_outstanding: Optional[float]
+    new_outstanding: Optional[float]
+    old_spent: Optional[float]
+    new_spent: Optional[float]
+    changed_at: datetime
+
+
+class CustomerChangesResponse(BaseModel):
+    changes: List[CustomerChangeResponse]
+    next_cursor: int
+    has_more: bool
+
+
+class BalanceHistoryPoint(BaseModel):
+    recorded_at: datetime
+    outstanding_balance: Optional[float]
+    total_spent: Optional[float]
+
+
+class BalanceHistoryResponse(BaseModel):
+    customer_id: int
+    resolution: str
+    points: List[BalanceHistoryPoint]
+
+
+class TopDebtor(BaseModel):
+    customer_id: int
+    name: Optional[str]
+    outstanding_balance: Optional[float]
+    credit_limit: Optional[float]
+
+
+class DashboardResponse(BaseModel):
+    customer_count: int
+    linked_count: int
+    unlinked_count: int
+    total_outstanding: float
+    over_limit_count: int
+    top_debtors: List[TopDebtor]
+    updated_at: datetime
+
+
+class SyncJobResponse(BaseModel):
+    id: str
+    tenant_id: str
+    resource: str
+    status: str
+    next_page: int
+    total_pages: Optional[int]
+    completed_pages: int
+    progress: float
+    new_count: int
+    updated_count: int
+    removed_count: int
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,247 @@
+"""Seed the database from a snapshot instead of a full upstream sync
+
+Accepts either an NDJSON customers export (GET /api/admin/export/customers
+?format=ndjson, optionally with links=true and/or gzip=true) or a SQLite
+backup of blvq.db. Rows are bulk-loaded in one transaction with SQLite's
+bulk-load pragmas (synchronous=OFF, in-memory temp store, larger page
+cache). Rows with the same key are updated in place (only the imported
+columns), so local-only columns such as a link's access score survive. An
+incremental sync then brings the imported rows up to date.
+
+Usage (from backend/):
+    python -m app.snapshot customers.ndjson.gz
+    python -m app.snapshot blvq-backup.db --no-sync
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from .database import engine, ensure_schema
+from .models import DEFAULT_TENANT, Customer, CustomerLink, CustomerStats
+from .tracing import log_event, setup_logging
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+GZIP_MAGIC = b"\x1f\x8b"
+IMPORT_BATCH_ROWS = 5000
+
+CUSTOMER_FIELDS = [
+    "name", "mobile", "email", "address", "credit_limit",
+    "outstanding_balance", "total_spent", "company_name", "loyalty_points",
+    "loyalty_text", "synced_at", "sync_generation", "deleted_at", "data",
+]
+DATETIME_FIELDS = {"synced_at", "deleted_at", "link_created_at", "link_last_accessed"}
+
+# Conflict target of each imported table's upsert
+CONFLICT_KEYS = {
+    Customer.__table__.name: ("tenant_id", "id"),
+    CustomerLink.__table__.name: ("uuid",),
+}
+
+
+BULK_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",  # 64 MB
+}
+
+
+@contextmanager
+def bulk_load_settings(conn: Connection):
+    """Trade durability for speed while a snapshot is loaded
+
+    The pooled connection is reused afterwards, so every pragma is put
+    back to its previous value.
+    """
+    previous = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in BULK_LOAD_PRAGMAS}
+    for name, value in BULK_LOAD_PRAGMAS.items():
+        conn.exec_driver_sql(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            conn.exec_driver_sql(f"PRAGMA {name} = {int(value)}")
+
+
+def snapshot_kind(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(len(SQLITE_MAGIC))
+    if head == SQLITE_MAGIC:
+        return "sqlite"
+    return "ndjson.gz" if head.startswith(GZIP_MAGIC) else "ndjson"
+
+
+def read_ndjson(path: str, compressed: bool) -> Iterator[Dict[str, Any]]:
+    with (gzip.open(path, "rt", encoding="utf-8") if compressed else open(path, encoding="utf-8")) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                for field in DATETIME_FIELDS:
+                    if record.get(field):
+                        record[field] = datetime.fromisoformat(record[field])
+                yield record
+
+
+def _flush(conn: Connection, model, rows: List[Dict[str, Any]]) -> int:
+    if rows:
+        keys = CONFLICT_KEYS[model.__tablename__]
+        statement = insert(model)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: statement.excluded[column] for column in rows[0] if column not in keys}
+        )
+        conn.execute(statement, rows)
+    count = len(rows)
+    rows.clear()
+    return count
+
+
+def import_ndjson(conn: Connection, path: str, compressed: bool, tenant_id: str = DEFAULT_TENANT) -> Dict[str, int]:
+    """Load an NDJSON export; rows with link_* fields also restore that link"""
+    counts = {"customers": 0, "links": 0}
+    customers: List[Dict[str, Any]] = []
+    links: List[Dict[str, Any]] = []
+    seen = set()
+
+    for record in read_ndjson(path, compressed):
+        customer_id = record.get("id")
+        if customer_id is None:
+            continue
+        # With links=true a customer appears once per link
+        if customer_id not in seen:
+            seen.add(customer_id)
+            customers.append({"id": customer_id, "tenant_id": tenant_id, **{field: record.get(field) for field in CUSTOMER_FIELDS}})
+        if record.get("link_uuid"):
+            links.append({
+                "uuid": record["link_uuid"],
+                "tenant_id": tenant_id,
+                "ewity_customer_id": customer_id,
+                "customer_name": record.get("name"),
+                "customer_phone": record.get("mobile"),
+                "created_at": record.get("link_created_at"),
+                "last_accessed": record.get("link_last_accessed"),
+            })
+
+        if len(customers) >= IMPORT_BATCH_ROWS:
+            counts["customers"] += _flush(conn, Customer, customers)
+        if len(links) >= IMPORT_BATCH_ROWS:
+            counts["links"] += _flush(conn, CustomerLink, links)
+
+    counts["customers"] += _flush(conn, Customer, customers)
+    counts["links"] += _flush(conn, CustomerLink, links)
+    return counts
+
+
+def import_sqlite(conn: Connection, path: str, tenant_id: str = DEFAULT_TENANT) -> Dict[str, int]:
+    """Copy one tenant's customers and links from a SQLite backup with INSERT ... SELECT
+
+    Backups taken before tenancy have no tenant_id column; all their rows
+    are loaded into `tenant_id`.
+    """
+    counts = {}
+    for table, name, skip in (
+        (Customer.__table__, "customers", set()),
+        (CustomerLink.__table__, "links", {"created_by"}),  # Users are not part of the snapshot
+    ):
+        available = {row[1] for row in conn.exec_driver_sql(f"PRAGMA snapshot.table_info({table.name})")}
+        columns = [column.name for column in table.columns if column.name in available and column.name not in skip]
+        if not columns:
+            counts[name] = 0
+            continue
+        if "tenant_id" in columns:
+            selected, where = ", ".join(columns), "tenant_id = ?"
+        else:
+            columns.append("tenant_id")
+            selected, where = ", ".join(columns[:-1] + ["? AS tenant_id"]), "true"
+        keys = CONFLICT_KEYS[table.name]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in keys)
+        # The WHERE clause also keeps SQLite from parsing ON CONFLICT as a join constraint
+        counts[name] = conn.exec_driver_sql(
+            f"INSERT INTO main.{table.name} ({', '.join(columns)}) "
+            f"SELECT {selected} FROM snapshot.{table.name} WHERE {where} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}",
+            (tenant_id,)
+        ).rowcount
+    return counts
+
+
+def import_snapshot(path: str, tenant_id: str = DEFAULT_TENANT) -> Dict[str, Any]:
+    """Bulk-load one tenant's snapshot into the local database
+
+    NDJSON rows are loaded into `tenant_id`; from a SQLite backup only that
+    tenant's rows are copied.
+    """
+    started = time.perf_counter()
+    kind = snapshot_kind(path)
+    ensure_schema()
+
+    with engine.connect() as conn:
+        if kind == "sqlite":
+            # ATTACH is not allowed inside a transaction
+            conn.exec_driver_sql("ATTACH DATABASE ? AS snapshot", (path,))
+            conn.commit()
+        try:
+            with bulk_load_settings(conn):
+                if kind == "sqlite":
+                    counts = import_sqlite(conn, path, tenant_id)
+                else:
+                    counts = import_ndjson(conn, path, kind == "ndjson.gz", tenant_id)
+                # Dashboard stats are rebuilt on next use
+                conn.execute(delete(CustomerStats).where(CustomerStats.tenant_id == tenant_id))
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if kind == "sqlite":
+                conn.exec_driver_sql("DETACH DATABASE snapshot")
+                conn.commit()
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    log_event("snapshot_imported", path=path, kind=kind, tenant_id=tenant_id, duration_ms=duration_ms, **counts)
+    return {"kind": kind, **counts, "duration_ms": duration_ms}
+
+
+async def catch_up_sync() -> Dict[str, Any]:
+    """Run one inline customer sync after an import (CLI use)"""
+    from .budget import upstream_origin
+    from .database import SessionLocal
+    from .ewity_client import ewity_client
+
+    db = SessionLocal()
+    try:
+        with upstream_origin("snapshot_catch_up"):
+            return await ewity_client.sync_all_customers_to_db(db)
+    finally:
+        db.close()
+        await ewity_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the BLVQ database from a snapshot")
+    parser.add_argument("path", help="NDJSON export (.ndjson / .ndjson.gz) or SQLite backup")
+    parser.add_argument("--no-sync", action="store_true", help="Skip the catch-up sync with Ewity")
+    args = parser.parse_args()
+
+    setup_logging()
+    result = import_snapshot(args.path)
+    print(json.dumps(result))
+    if not args.no_sync:
+        sync_result = asyncio.run(catch_up_sync())
+        print(json.dumps(sync_result))
+        if not sync_result.get("success"):
+            log_event("snapshot_catch_up_failed", logging.ERROR, error=sync_result.get("error"))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""Declarative sync of paginated Ewity resources into local tables
+
+Every Ewity list endpoint returns the same envelope:
+`{"data": [...], "pagination": {"lastPage": N, ...}}`. A `ResourceSpec`
+names the endpoint, the local model and how upstream fields map to its
+columns; `sync_resource` then mirrors the whole resource:
+
+- pages are fetched `sync_page_concurrency` at a time, but committed in
+  page order so a SyncJob checkpoint (`next_page`) stays meaningful
+- each page is upserted with one SELECT for the existing rows, one bulk
+  INSERT for new rows, one bulk UPDATE for rows whose upstream JSON
+  changed and one UPDATE restamping the generation of unchanged rows
+- rows carry the sync generation; after a complete pass, rows from older
+  generations are swept (purged by default, see `ResourceSpec.sweep`)
+- everything is scoped to the client's tenant, and page fetches take a
+  slot from `sync_scheduler`, which shares sync fetches fairly between
+  tenants
+
+Resource-specific side effects (change logs, live events, cache
+invalidation) hook in through `on_page` (inside the page transaction) and
+`after_commit`.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple, Union
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .metrics import SYNC_DURATION, SYNC_ROWS
+from .models import EwityEmployee, EwityExpense, EwityLocation, EwityTag, EwityUser
+from .tracing import log_event
+
+settings = get_settings()
+
+ColumnSource = Union[str, Callable[[Dict[str, Any]], Any]]
+
+
+class ResourceSpec:
+    """How one Ewity list endpoint maps onto a local table
+
+    `columns` maps model column names to an upstream field name or a
+    function of the upstream record. The model must have `id`, `tenant_id`,
+    `data`, `synced_at` and `sync_generation` columns (and optionally
+    `deleted_at`), with `(tenant_id, id)` as its primary key.
+    `sweep(db, generation, tenant_id)` replaces the default purge of
+    unseen rows.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        endpoint: str,
+        model,
+        columns: Dict[str, ColumnSource],
+        key: str = "id",
+        on_page: Optional[Callable[[Session, "SyncPage"], None]] = None,
+        after_commit: Optional[Callable[["SyncPage"], None]] = None,
+        sweep: Optional[Callable[[Session, int, str], int]] = None
+    ):
+        self.name = name
+        self.endpoint = endpoint
+        self.model = model
+        self.columns = columns
+        self.key = key
+        self.on_page = on_page
+        self.after_commit = after_commit
+        self.sweep = sweep
+
+    def row_values(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        values = {}
+        for column, source in self.columns.items():
+            value = source(record) if callable(source) else record.get(source)
+            # Nested objects are kept as JSON text in scalar columns
+            values[column] = json.dumps(value) if isinstance(value, (dict, list)) else value
+        return values
+
+
+class SyncPage:
+    """What changed on one page; passed to the spec's hooks"""
+
+    def __init__(self, number: int, tenant_id: str, now: datetime, counts: Counter, stamp: Optional[str] = None):
+        self.number = number
+        self.tenant_id = tenant_id
+        self.now = now
+        self.counts = counts  # Run-wide counters; hooks may add their own keys
+        self.stamp = stamp  # Extra timestamp column set to `now` on every row written
+        self.inserted: List[Dict[str, Any]] = []
+        self.changed: List[Tuple[Mapping[str, Any], Dict[str, Any]]] = []  # (old row, new record)
+
+
+class FairScheduler:
+    """Share a fixed number of sync page-fetch slots fairly between tenants
+
+    While slots are free, fetches start at once. Under contention, waiting
+    fetches are granted one tenant at a time in rotation, so a shop with
+    hundreds of pages cannot starve another shop's sync. Interactive
+    balance lookups never take slots and are not delayed by syncs.
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str):
+        if self._free > 0 and not self._waiting:
+            self._free -= 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(tenant_id, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()  # Granted just before cancellation
+                else:
+                    queue = self._waiting.get(tenant_id)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._waiting[tenant_id]
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiting:
+            tenant_id, queue = next(iter(self._waiting.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(tenant_id)  # Next tenant's turn
+            else:
+                del self._waiting[tenant_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+def next_generation(db: Session, model, tenant_id: str) -> int:
+    return (db.query(func.max(model.sync_generation)).filter(model.tenant_id == tenant_id).scalar() or 0) + 1
+
+
+def purge_unseen(db: Session, model, generation: int, tenant_id: str) -> int:
+    """Default sweep: delete rows a complete sync did not see"""
+    removed = db.execute(
+        delete(model).where(
+            model.tenant_id == tenant_id,
+            (model.sync_generation.is_(None)) | (model.sync_generation < generation)
+        )
+    ).rowcount
+    db.commit()
+    return removed
+
+
+def upsert_page(
+    db: Session,
+    spec: ResourceSpec,
+    records: List[Dict[str, Any]],
+    generation: Optional[int],
+    page: SyncPage
+) -> None:
+    """Write one page of upstream records with set-based statements (not committed)
+
+    With `generation=None` (out-of-band refresh) existing rows keep their
+    generation and new rows get none, so only a full sync decides liveness.
+    """
+    model = spec.model
+    table = model.__table__
+    tombstones = "deleted_at" in table.c
+
+    by_key = {}
+    for record in records:
+        key = record.get(spec.key)
+        if key:
+            by_key[key] = record
+    if not by_key:
+        return
+
+    existing = {
+        row["id"]: row
+        for row in db.execute(
+            select(table).where(table.c.tenant_id == page.tenant_id, table.c.id.in_(list(by_key)))
+        ).mappings()
+    }
+
+    new_rows, changed_rows, unchanged_ids = [], [], []
+    for key, record in by_key.items():
+        row_json = json.dumps(record)
+        old = existing.get(key)
+        if old is not None and old["data"] == row_json and not (tombstones and old["deleted_at"]):
+            unchanged_ids.append(key)
+            continue
+
+        values = spec.row_values(record)
+        values.update(
+            id=key,
+            tenant_id=page.tenant_id,
+            data=row_json,
+            synced_at=page.now
+        )
+        if page.stamp:
+            values[page.stamp] = page.now
+        if generation is not None or old is None:
+            values["sync_generation"] = generation
+        if tombstones:
+            values["deleted_at"] = None
+        if old is None:
+            new_rows.append(values)
+            page.inserted.append(record)
+        else:
+            changed_rows.append(values)
+            page.changed.append((old, record))
+
+    if new_rows:
+        db.execute(insert(model), new_rows)
+    if changed_rows:
+        db.execute(update(model), changed_rows)
+    if unchanged_ids:
+        restamp = {"synced_at": page.now}
+        if page.stamp:
+            restamp[page.stamp] = page.now
+        if generation is not None:
+            restamp["sync_generation"] = generation
+        db.execute(
+            update(model)
+            .where(model.tenant_id == page.tenant_id, model.id.in_(unchanged_ids))
+            .values(**restamp)
+            .execution_options(synchronize_session=False)
+        )
+
+    page.counts["new"] += len(new_rows)
+    page.counts["updated"] += len(changed_rows) + len(unchanged_ids)
+    page.counts["changed"] += len(changed_rows)
+
+
+async def sync_resource(
+    client,
+    db: Session,
+    spec: ResourceSpec,
+    job=None,
+    cancel_event: Optional[asyncio.Event] = None
+) -> Dict[str, Any]:
+    """Mirror a paginated Ewity resource into its local table
+
+    With a SyncJob, starts from its checkpoint and advances it in the same
+    commit as each page's rows; the job's generation is kept so a resumed
+    run still sweeps correctly. `total`, `new` and `updated` count rows
+    seen, inserted and already present; `changed` counts rows whose
+    upstream data differed.
+    """
+    started = time.perf_counter()
+    tenant_id = client.tenant_id
+    page = job.next_page if job else 1
+    counts: Counter = Counter()
+    if job:
+        counts["new"] = job.new_count
+        counts["updated"] = job.updated_count
+
+    def result(**extra) -> Dict[str, Any]:
+        standard = ("new", "updated", "changed", "removed")
+        return {
+            "total": counts["new"] + counts["updated"],
+            **{kind: counts[kind] for kind in standard},
+            **{kind: value for kind, value in counts.items() if kind not in standard},
+            **extra,
+        }
+
+    try:
+        log_event("sync_started", resource=spec.name, tenant_id=tenant_id, job_id=job.id if job else None, page=page)
+
+        total_pages = (job.total_pages if job else None) or page
+        generation = (job.generation if job else None) or next_generation(db, spec.model, tenant_id)
+        if job:
+            job.generation = generation
+
+        while page <= total_pages:
+            if cancel_event is not None and cancel_event.is_set():
+                log_event("sync_cancelled", resource=spec.name, job_id=job.id if job else None, page=page)
+                return {"success": False, "cancelled": True, **result()}
+
+            # Fetch a window of pages concurrently; the first page alone tells us the page count
+            window = list(range(page, min(page + settings.sync_page_concurrency - 1, total_pages) + 1))
+            async def fetch(number: int) -> Dict[str, Any]:
+                async with sync_scheduler.slot(tenant_id):
+                    return await client._get_page_with_retries(spec.endpoint, number)
+
+            responses = await asyncio.gather(*(fetch(number) for number in window), return_exceptions=True)
+
+            for number, data in zip(window, responses):
+                if isinstance(data, BaseException):
+                    raise data
+
+                # API uses 'lastPage' not 'totalPages'; keep it current as rows are added
+                pagination = data.get("pagination") or {}
+                if number == 1 or (job and job.total_pages is None):
+                    log_event("sync_pages_found", resource=spec.name, pages=pagination.get("lastPage", 1), rows=pagination.get("total", 0))
+                total_pages = pagination.get("lastPage", total_pages)
+
+                sync_page = SyncPage(number, tenant_id, datetime.utcnow(), counts)
+                upsert_page(db, spec, data.get("data") or [], generation, sync_page)
+                if spec.on_page:
+                    spec.on_page(db, sync_page)
+
+                # Advance the checkpoint atomically with this page's rows
+                if job:
+                    job.next_page = number + 1
+                    job.total_pages = total_pages
+                    job.new_count = counts["new"]
+                    job.updated_count = counts["updated"]
+
+                db.commit()
+                log_event("sync_page_done", logging.DEBUG, resource=spec.name, page=number, total_pages=total_pages)
+
+                if spec.after_commit:
+                    spec.after_commit(sync_page)
+
+            page = window[-1] + 1
+
+        # Only a complete pass that saw rows may conclude anything is gone
+        if counts["new"] + counts["updated"]:
+            sweep = spec.sweep or (lambda session, gen, tenant: purge_unseen(session, spec.model, gen, tenant))
+            counts["removed"] += sweep(db, generation, tenant_id)
+            if job:
+                job.removed_count = counts["removed"]
+                db.commit()
+
+        log_event(
+            "sync_finished",
+            resource=spec.name,
+            tenant_id=tenant_id,
+            **result(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        SYNC_DURATION.labels(spec.name, "success").observe(time.perf_counter() - started)
+        for kind in ("new", "updated", "changed", "removed"):
+            SYNC_ROWS.labels(spec.name, kind).inc(counts[kind])
+
+        return {"success": True, **result()}
+
+    except Exception as e:
+        log_event("sync_failed", logging.ERROR, resource=spec.name, tenant_id=tenant_id, page=page, error=str(e))
+        db.rollback()
+        SYNC_DURATION.labels(spec.name, "error").observe(time.perf_counter() - started)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+async def refresh_pages(
+    client,
+    db: Session,
+    spec: ResourceSpec,
+    pages: List[int],
+    stamp: Optional[str] = None
+) -> Dict[str, Any]:
+    """Re-fetch selected pages of a resource outside a full sync
+
+    Each page is upserted and committed like a sync page (hooks included),
+    but without touching sync generations. With `stamp`, that column is
+    also set to the refresh time on every row of the page. Pages that fail
+    are skipped; the next full sync covers them.
+    """
+    tenant_id = client.tenant_id
+    counts: Counter = Counter()
+    for number in pages:
+        try:
+            async with sync_scheduler.slot(tenant_id):
+                data = await client._get(spec.endpoint, params={"page": number})
+        except Exception as e:
+            log_event("refresh_page_failed", logging.WARNING, resource=spec.name, tenant_id=tenant_id, page=number, error=str(e))
+            counts["failed"] += 1
+            continue
+
+        sync_page = SyncPage(number, tenant_id, datetime.utcnow(), counts, stamp)
+        upsert_page(db, spec, data.get("data") or [], None, sync_page)
+        if spec.on_page:
+            spec.on_page(db, sync_page)
+        db.commit()
+        if spec.after_commit:
+            spec.after_commit(sync_page)
+        counts["pages"] += 1
+
+    return dict(counts)
+
+
+# Global scheduler for sync page fetches across all tenants
+sync_scheduler = FairScheduler(settings.sync_max_concurrent_fetches)
+
+
+# Resources mirrored without extra behaviour (customers are defined in ewity_client)
+MIRRORED_RESOURCES = {
+    spec.name: spec
+    for spec in (
+        ResourceSpec("users", "/users", EwityUser, {
+            "username": "username",
+            "type": "type",
+            "name": "name",
+            "email": "email",
+            "mobile": "mobile",
+        }),
+        ResourceSpec("employees", "/employees", EwityEmployee, {
+            "name": "name",
+        }),
+        ResourceSpec("locations", "/locations", EwityLocation, {
+            "name": "name",
+            "display_name": "display_name",
+            "type": "type",
+            "city": "city",
+            "phone": "phone",
+        }),
+        ResourceSpec("expenses", "/expenses", EwityExpense, {
+            "category": "category",
+            "description": "description",
+            "amount": "amount",
+            "date": "date",
+        }),
+        ResourceSpec("tags", "/tags", EwityTag, {
+            "name": "name",
+        }),
+    )
+}
@@ -0,0 +1,200 @@
+"""Background resource sync jobs with checkpoints, cancel and resume"""
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .database import SessionLocal
+from .models import DEFAULT_TENANT, SyncJob, Tenant
+from .tenancy import tenant_clients
+from .sync_engine import MIRRORED_RESOURCES
+from .budget import upstream_origin
+from .tracing import log_event
+
+settings = get_settings()
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class SyncJobManager:
+    """Run resource syncs as asyncio tasks tracked in the sync_jobs table.
+
+    Each job commits its page checkpoint together with the page's rows. A job
+    interrupted by a crash or restart is left as running/pending in the
+    database and picked up again by `resume_incomplete()` at startup.
+    `run_schedule()` starts customer syncs for tenants with a sync interval.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_events: Dict[str, asyncio.Event] = {}
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    def start(self, db: Session, resource: str = "customers", tenant_id: str = DEFAULT_TENANT) -> SyncJob:
+        """Start a new sync job, or return the one already in progress for the tenant's resource"""
+        active = db.query(SyncJob).filter(
+            SyncJob.tenant_id == tenant_id,
+            SyncJob.resource == resource,
+            SyncJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if active:
+            if not self.is_running(active.id):
+                self._launch(active.id)
+            return active
+
+        job = SyncJob(status="pending", resource=resource, tenant_id=tenant_id)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._launch(job.id)
+        return job
+
+    def resume(self, db: Session, job: SyncJob) -> SyncJob:
+        """Continue a failed, cancelled or orphaned job from its checkpoint"""
+        if not self.is_running(job.id):
+            job.status = "pending"
+            job.error = None
+            job.finished_at = None
+            db.commit()
+            self._launch(job.id)
+        return job
+
+    def cancel(self, db: Session, job: SyncJob) -> SyncJob:
+        """Ask a job to stop after its current page"""
+        event = self._cancel_events.get(job.id)
+        if event is not None and self.is_running(job.id):
+            event.set()
+        elif job.status in ACTIVE_STATUSES:
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        return job
+
+    def resume_incomplete(self) -> int:
+        """Relaunch jobs left running/pending by a previous process"""
+        db = SessionLocal()
+        try:
+            jobs = db.query(SyncJob).filter(SyncJob.status.in_(ACTIVE_STATUSES)).all()
+            for job in jobs:
+                if not self.is_running(job.id):
+                    log_event("sync_job_resumed", job_id=job.id, next_page=job.next_page)
+                    self._launch(job.id)
+            return len(jobs)
+        finally:
+            db.close()
+
+    def start_due(self, db: Session) -> int:
+        """Start customer syncs for tenants whose sync interval has elapsed"""
+        started = 0
+        now = datetime.utcnow()
+        tenants = db.query(Tenant).filter(Tenant.sync_interval_minutes > 0).all()
+        for tenant in tenants:
+            last = db.query(func.max(SyncJob.created_at)).filter(
+                SyncJob.tenant_id == tenant.id,
+                SyncJob.resource == "customers"
+            ).scalar()
+            if last is None or last + timedelta(minutes=tenant.sync_interval_minutes) <= now:
+                job = self.start(db, tenant_id=tenant.id)
+                log_event("sync_job_scheduled", tenant_id=tenant.id, job_id=job.id)
+                started += 1
+        return started
+
+    async def run_schedule(self) -> None:
+        """Check tenant sync schedules until cancelled"""
+        while True:
+            await asyncio.sleep(settings.sync_schedule_check_seconds)
+            db = SessionLocal()
+            try:
+                self.start_due(db)
+            except Exception as e:
+                log_event("sync_schedule_error", logging.ERROR, error=str(e))
+            finally:
+                db.close()
+
+    async def shutdown(self) -> None:
+        """Stop running tasks; their jobs stay active and resume on next start"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _launch(self, job_id: str) -> None:
+        self._cancel_events[job_id] = asyncio.Event()
+        # Fresh context: don't inherit the triggering request's trace/origin
+        task = asyncio.create_task(self._run(job_id), context=contextvars.Context())
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._forget(job_id, task))
+
+    def _forget(self, job_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+            self._cancel_events.pop(job_id, None)
+
+    async def _run(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            job: Optional[SyncJob] = db.get(SyncJob, job_id)
+            if job is None:
+                return
+            job.status = "running"
+            job.started_at = job.started_at or datetime.utcnow()
+            db.commit()
+
+            cancel_event = self._cancel_events.get(job_id)
+            client = tenant_clients.get(job.tenant_id, db)
+            with upstream_origin(f"sync_job:{job.resource}"):
+                if job.resource == "customers":
+                    result = await client.sync_all_customers_to_db(db, job=job, cancel_event=cancel_event)
+                else:
+                    result = await client.sync_resource(
+                        db, MIRRORED_RESOURCES[job.resource], job=job, cancel_event=cancel_event
+                    )
+
+            if result.get("success"):
+                job.status = "completed"
+            elif result.get("cancelled"):
+                job.status = "cancelled"
+            else:
+                job.status = "failed"
+                job.error = result.get("error")
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            log_event(
+                "sync_job_finished",
+                logging.INFO if job.status != "failed" else logging.ERROR,
+                job_id=job_id,
+                tenant_id=job.tenant_id,
+                resource=job.resource,
+                status=job.status,
+                next_page=job.next_page
+            )
+        except Exception as e:
+            # Cancellation (shutdown) is not an Exception: those jobs stay running and resume
+            db.rollback()
+            job = db.get(SyncJob, job_id)
+            if job is not None:
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = datetime.utcnow()
+                db.commit()
+            log_event(
+                "sync_job_finished",
+                logging.ERROR,
+                job_id=job_id,
+                tenant_id=job.tenant_id if job is not None else None,
+                resource=job.resource if job is not None else None,
+                status="failed",
+                error=str(e)
+            )
+        finally:
+            db.close()
+
+
+# Global job manager instance
+sync_jobs = SyncJobManager()
@@ -0,0 +1,83 @@
+"""Shops (tenants) and their Ewity clients
+
+Every shop is a row in `tenants` with its own Ewity token. Customer data,
+links, sync jobs, change log and history carry a `tenant_id` column. The
+`default` tenant uses EWITY_API_TOKEN and the module-level `ewity_client`,
+so a single-shop deployment needs no tenant setup at all.
+
+Each other tenant gets its own EwityClient (pooled HTTP client, call
+budget and cache namespace), created on first use and kept for the life
+of the process.
+"""
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from .budget import UpstreamBudget
+from .database import SessionLocal, get_db
+from .ewity_client import EwityClient, ewity_client
+from .models import DEFAULT_TENANT, Tenant
+
+
+class TenantClients:
+    """Per-tenant EwityClient registry"""
+
+    def __init__(self):
+        self._clients: Dict[str, EwityClient] = {DEFAULT_TENANT: ewity_client}
+
+    def get(self, tenant_id: str, db: Optional[Session] = None) -> EwityClient:
+        """Client for a tenant; raises KeyError for unknown tenants"""
+        client = self._clients.get(tenant_id)
+        if client is not None:
+            return client
+
+        session = db or SessionLocal()
+        try:
+            tenant = session.get(Tenant, tenant_id)
+        finally:
+            if db is None:
+                session.close()
+        if tenant is None:
+            raise KeyError(tenant_id)
+
+        client = self._clients[tenant_id] = EwityClient(
+            tenant_id=tenant_id,
+            api_token=tenant.ewity_api_token,
+            base_url=tenant.ewity_api_base_url,
+            budget=UpstreamBudget()
+        )
+        return client
+
+    async def reset(self, tenant_id: str) -> None:
+        """Drop a tenant's client (after its token or URL changed)"""
+        if tenant_id == DEFAULT_TENANT:
+            return
+        client = self._clients.pop(tenant_id, None)
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+
+
+def ensure_default_tenant(db: Session) -> Tenant:
+    tenant = db.get(Tenant, DEFAULT_TENANT)
+    if tenant is None:
+        tenant = Tenant(id=DEFAULT_TENANT, name="Default")
+        db.add(tenant)
+        db.commit()
+    return tenant
+
+
+async def get_tenant_id(tenant: str = DEFAULT_TENANT, db: Session = Depends(get_db)) -> str:
+    """Dependency: the `?tenant=` query parameter, checked against known tenants"""
+    if tenant != DEFAULT_TENANT and db.get(Tenant, tenant) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tenant not found"
+        )
+    return tenant
+
+
+# Global tenant client registry
+tenant_clients = TenantClients()
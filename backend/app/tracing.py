@@ -0,0 +1,147 @@
+"""Lightweight request tracing spans, Server-Timing headers and JSON logs"""
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from .config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger("blvq")
+
+
+class JSONFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging() -> None:
+    """Send the app logger's records to stderr as JSON lines"""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JSONFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(settings.log_level.upper())
+    logger.propagate = False
+
+
+class Trace:
+    """Spans collected for one sampled request"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.spans: List[Tuple[str, float]] = []
+
+    def summary(self) -> Dict[str, Tuple[float, int]]:
+        """Total milliseconds and count per span name, in first-seen order"""
+        totals: Dict[str, Tuple[float, int]] = {}
+        for name, duration_ms in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration_ms, count + 1)
+        return totals
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """Emit a structured log line, tagged with the current trace ID if any"""
+    if not logger.isEnabledFor(level):
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        fields["trace_id"] = trace.trace_id
+    logger.log(level, event, extra={"fields": fields})
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a named span of the current request (no-op when unsampled)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, (time.perf_counter() - started) * 1000))
+
+
+def server_timing(trace: Trace, total_ms: float) -> str:
+    """Render a Server-Timing header value from a trace"""
+    parts = []
+    for name, (duration_ms, count) in trace.summary().items():
+        part = f"{name};dur={duration_ms:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+class TracingMiddleware:
+    """ASGI middleware sampling requests for tracing.
+
+    Sampled requests get a `Server-Timing` response header with per-phase
+    durations and a `request` JSON log line listing the same spans. Requests
+    that are not sampled only pay for one random() call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= settings.tracing_sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(trace, total_ms).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            log_event(
+                "request",
+                method=scope["method"],
+                route=getattr(route, "path", scope["path"]),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+                spans={
+                    name: round(duration_ms, 2)
+                    for name, (duration_ms, _) in trace.summary().items()
+                },
+            )
+            _current_trace.reset(token)
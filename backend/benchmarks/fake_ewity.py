@@ -0,0 +1,145 @@
+"""Local stand-in for the Ewity POS API (see EWITY_API_SUMMARY.md)
+
+Serves `/v1` and the paginated `/v1/customers` endpoint with the same
+envelope as production, plus configurable latency and error injection.
+Unknown paths get Ewity's 404 error body; with a required token, requests
+without `Authorization: Bearer <token>` get a 401.
+
+Run standalone:
+    python -m benchmarks.fake_ewity --customers 241 --latency-ms 80 --port 9001
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException
+
+PAGE_SIZE = 20  # Ewity always returns 20 per page regardless of pageSize
+
+
+def make_customers(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Deterministic fake customers shaped like Ewity customer records"""
+    rng = random.Random(seed)
+    customers = []
+    for i in range(count):
+        customers.append({
+            "id": 1500000 + i,
+            "company_name": None,
+            "name": f"Customer {i:04d}",
+            "address": None,
+            "email": None,
+            "mobile": f"7{rng.randrange(10**6):06d}",
+            "birthday": None,
+            "passport": None,
+            "bill_note": None,
+            "price_level": None,
+            "tax_number": None,
+            "note": None,
+            "credit_limit": rng.choice([0, 500, 1000, 2500]),
+            "total_outstanding": round(rng.uniform(0, 800), 2),
+            "total_spent": round(rng.uniform(0, 20000), 2),
+            "loyalty_points": None,
+            "loyalty_text": "No Loyalty",
+            "loyalty_text_extra": None,
+            "loyalty_program": None,
+            "created_unix": 1766627737 - i * 3600,
+        })
+    return customers
+
+
+class FakeEwity:
+    """State and behaviour of the fake API (mutable between benchmark runs)"""
+
+    def __init__(self, customers: int = 241, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 42, require_token: Optional[str] = None):
+        self.customers = make_customers(customers, seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.require_token = require_token
+        self.calls: Dict[str, int] = {}
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    async def delay(self) -> None:
+        latency = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def error(self, status: int = 500, code: str = "INTERNAL_ERROR", message: str = "Injected failure",
+              text: str = "Internal Server Error") -> JSONResponse:
+        return JSONResponse(status_code=status, content={
+            "code": status,
+            "errorCode": code,
+            "message": message,
+            "errorRef": "FAKE1",
+            "ts": int(time.time()),
+            "errorCodeText": text,
+        })
+
+
+def create_app(fake: FakeEwity) -> FastAPI:
+    app = FastAPI(title="Fake Ewity API")
+
+    @app.middleware("http")
+    async def count_and_inject(request: Request, call_next):
+        fake.calls[request.url.path] = fake.calls.get(request.url.path, 0) + 1
+        await fake.delay()
+        if fake.require_token and request.headers.get("authorization") != f"Bearer {fake.require_token}":
+            return fake.error(401, "UNAUTHORIZED", "Invalid or missing API token", "Unauthorized")
+        if fake.error_rate and fake.rng.random() < fake.error_rate:
+            return fake.error()
+        return await call_next(request)
+
+    @app.exception_handler(HTTPException)
+    async def ewity_error(request: Request, exc: HTTPException):
+        if exc.status_code == 404:
+            return fake.error(404, "NOT_FOUND", "Invalid API endpoint", "Not Found")
+        return fake.error(exc.status_code, "ERROR", str(exc.detail), str(exc.detail))
+
+    @app.get("/v1")
+    async def info():
+        return {"data": {"description": "Ewity Api", "version": "v1"}}
+
+    @app.get("/v1/customers")
+    async def customers(page: int = 1):
+        total = len(fake.customers)
+        last_page = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+        start = (page - 1) * PAGE_SIZE
+        return {
+            "pagination": {"total": total, "pageSize": PAGE_SIZE, "current": page, "lastPage": last_page},
+            "data": fake.customers[start:start + PAGE_SIZE] if page >= 1 else [],
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local fake Ewity API")
+    parser.add_argument("--customers", type=int, default=241)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--require-token", help="Answer 401 unless sent as a Bearer token")
+    args = parser.parse_args()
+
+    fake = FakeEwity(args.customers, args.latency_ms, args.jitter_ms, args.error_rate, args.seed, args.require_token)
+    print(f"Fake Ewity API at http://127.0.0.1:{args.port}/v1")
+    uvicorn.run(create_app(fake), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
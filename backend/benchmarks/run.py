@@ -0,0 +1,262 @@
+"""Offline benchmark harness for the BLVQ backend
+
+Starts the fake Ewity API (benchmarks/fake_ewity.py) on a local port, points
+the app at it with a throwaway SQLite database, drives the FastAPI app
+in-process and reports latency percentiles, throughput and upstream call
+counts per scenario. Seeds and parameters are fixed and recorded, so JSON
+results from different commits can be compared with --compare.
+
+Usage (from backend/):
+    python -m benchmarks.run
+    python -m benchmarks.run --customers 1000 --latency-ms 80 --error-rate 0.02
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+import uvicorn
+
+from .fake_ewity import FakeEwity, create_app
+
+SCENARIOS = ["balance", "batch", "search", "sync"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_ewity(fake: FakeEwity, port: int) -> uvicorn.Server:
+    """Run the fake API in a background thread with its own event loop"""
+    server = uvicorn.Server(uvicorn.Config(create_app(fake), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def summarise(latencies: List[float], errors: int, wall: float, upstream_calls: int) -> Dict[str, Any]:
+    count = len(latencies)
+    if count >= 2:
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = q[49], q[94], q[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": count,
+        "errors": errors,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "throughput_rps": round(count / wall, 1) if wall else 0.0,
+        "upstream_calls": upstream_calls,
+        "upstream_calls_per_request": round(upstream_calls / count, 2) if count else 0.0,
+    }
+
+
+async def drive(call: Callable[[int], Awaitable[bool]], requests: int, concurrency: int):
+    """Run `requests` calls with bounded concurrency; returns (latencies, errors, wall)"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await call(i)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_benchmarks(args, fake: FakeEwity) -> Dict[str, Any]:
+    import httpx
+    from app.main import app, lifespan
+    from app.database import SessionLocal
+    from app.models import CustomerLink
+
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {}
+
+    async with lifespan(app):
+        # Links for a sample of customers, spread across all pages
+        db = SessionLocal()
+        sample = rng.sample(fake.customers, min(args.links, len(fake.customers)))
+        links = [CustomerLink(ewity_customer_id=c["id"], customer_name=c["name"]) for c in sample]
+        db.add_all(links)
+        db.commit()
+        uuids = [link.uuid for link in links]
+        db.close()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            login = await client.post("/api/admin/login", json={
+                "username": os.environ.get("ADMIN_USERNAME", "admin"),
+                "password": os.environ.get("ADMIN_PASSWORD", "admin123"),
+            })
+            auth = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            async def balance(i: int) -> bool:
+                response = await client.get(f"/api/customer/{uuids[i % len(uuids)]}")
+                return response.status_code == 200
+
+            async def batch(i: int) -> bool:
+                picked = [uuids[(i * args.batch_size + j) % len(uuids)] for j in range(args.batch_size)]
+                response = await client.post("/api/customer/batch", json={"uuids": picked})
+                return response.status_code == 200
+
+            queries = [c["name"][:-2] for c in sample] + [c["mobile"][:4] for c in sample]
+
+            async def search(i: int) -> bool:
+                response = await client.get(
+                    "/api/admin/customers/search",
+                    params={"q": queries[i % len(queries)]},
+                    headers=auth,
+                )
+                return response.status_code == 200
+
+            async def sync(i: int) -> bool:
+                # Refresh starts a background job; time it until it finishes
+                response = await client.post("/api/admin/customers/refresh", headers=auth)
+                if response.status_code != 202:
+                    return False
+                job = response.json()
+                while job["status"] in ("pending", "running"):
+                    await asyncio.sleep(0.01)
+                    job = (await client.get(f"/api/admin/sync/jobs/{job['id']}", headers=auth)).json()
+                return job["status"] == "completed"
+
+            plan = {
+                "balance": (balance, args.requests, args.concurrency),
+                "batch": (batch, max(1, args.requests // args.batch_size), args.concurrency),
+                "search": (search, args.requests, args.concurrency),
+                "sync": (sync, args.sync_runs, 1),
+            }
+            for name in args.scenarios:
+                call, requests, concurrency = plan[name]
+                fake.reset_calls()
+                latencies, errors, wall = await drive(call, requests, concurrency)
+                results[name] = summarise(latencies, errors, wall, fake.total_calls)
+                print_row(name, results[name])
+
+    return results
+
+
+def print_row(name: str, result: Dict[str, Any]) -> None:
+    print(
+        f"{name:<10} n={result['requests']:<5} err={result['errors']:<4} "
+        f"p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms p99={result['p99_ms']:>8.2f}ms "
+        f"{result['throughput_rps']:>8.1f} req/s  upstream={result['upstream_calls']} "
+        f"({result['upstream_calls_per_request']}/req)"
+    )
+
+
+def compare(results: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    comparable = lambda params: {k: v for k, v in (params or {}).items() if k != "scenarios"}
+    if comparable(baseline.get("params")) != comparable(results["params"]):
+        print("Warning: baseline was run with different parameters")
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):")
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "upstream_calls"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (current[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {name:<10} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline BLVQ backend benchmarks against a fake Ewity API")
+    parser.add_argument("--customers", type=int, default=241)
+    parser.add_argument("--links", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--sync-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Compare with a previous JSON result file")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fake = FakeEwity(args.customers, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    port = free_port()
+    server = start_fake_ewity(fake, port)
+
+    # Point the app at the fake API and a throwaway database before importing it
+    workdir = tempfile.mkdtemp(prefix="blvq-bench-")
+    os.environ.update({
+        "EWITY_API_TOKEN": "bench-token",
+        "EWITY_API_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "RATE_LIMIT_ENABLED": "false",
+        # Measure the live upstream path, not rows kept warm by the hot refresher
+        "HOT_REFRESH_ENABLED": "false",
+        "BALANCE_LOCAL_FRESH_SECONDS": "0",
+        "TRACING_SAMPLE_RATE": "0",
+        "LOG_LEVEL": "WARNING",
+    })
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    print(f"BLVQ benchmarks @ {git_commit()}  {json.dumps(params)}")
+    try:
+        scenario_results = asyncio.run(run_benchmarks(args, fake))
+    finally:
+        server.should_exit = True
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "scenarios": scenario_results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Cold start benchmark for the BLVQ backend
+
+Runs the app in fresh interpreters against a throwaway SQLite database that
+already has its schema, an admin user and a customer (a normal restart, so
+no initial sync and no password hashing). Each run reports the time to
+import `app.main` and the time for the lifespan startup to finish, and
+which lazily loaded dependencies were imported anyway. Exits non-zero when
+the median exceeds a budget or a lazy dependency was loaded at startup.
+
+Usage (from backend/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --import-budget-ms 800 --startup-budget-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Only needed by specific routes; must not be imported by a plain restart
+LAZY_MODULES = ["qrcode", "PIL", "passlib", "argon2", "jose", "httpx"]
+
+SETUP = """
+from app.database import SessionLocal, ensure_schema
+from app.models import Customer, User
+ensure_schema()
+db = SessionLocal()
+db.add(User(username="admin", password_hash="x", role="admin"))
+db.add(Customer(id=1, name="Startup benchmark"))
+db.commit()
+db.close()
+"""
+
+RUN = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    # Run the lifespan directly (the TestClient would import httpx itself)
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter(), [name for name in {lazy!r} if name in sys.modules]
+
+ready, eager = asyncio.run(startup())
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "eager": eager,
+}}))
+"""
+
+
+def run_python(code: str, env: dict) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLVQ backend cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=800.0)
+    parser.add_argument("--startup-budget-ms", type=float, default=300.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="blvq-startup-")
+    env = {
+        **os.environ,
+        "EWITY_API_TOKEN": "bench-token",
+        "EWITY_API_BASE_URL": "http://127.0.0.1:9/v1",  # Never called on a restart
+        "DATABASE_URL": f"sqlite:///{workdir}/startup.db",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": os.getcwd(),
+    }
+    run_python(SETUP, env)
+
+    runs = [json.loads(run_python(RUN.format(lazy=LAZY_MODULES), env).strip().splitlines()[-1]) for _ in range(args.runs)]
+    results = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "import_max_ms": round(max(run["import_ms"] for run in runs), 1),
+        "startup_ms": round(statistics.median(run["startup_ms"] for run in runs), 1),
+        "startup_max_ms": round(max(run["startup_ms"] for run in runs), 1),
+        "eager": sorted({name for run in runs for name in run["eager"]}),
+    }
+
+    print(
+        f"import   p50={results['import_ms']:>8.1f}ms max={results['import_max_ms']:>8.1f}ms  budget={args.import_budget_ms:.0f}ms\n"
+        f"startup  p50={results['startup_ms']:>8.1f}ms max={results['startup_max_ms']:>8.1f}ms  budget={args.startup_budget_ms:.0f}ms\n"
+        f"lazy modules loaded at startup: {', '.join(results['eager']) or 'none'}"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    if results["import_ms"] > args.import_budget_ms:
+        failures.append("import time over budget")
+    if results["startup_ms"] > args.startup_budget_ms:
+        failures.append("startup time over budget")
+    if results["eager"]:
+        failures.append("lazy modules imported at startup")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
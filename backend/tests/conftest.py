@@ -0,0 +1,107 @@
+"""Shared fixtures: a throwaway SQLite database and an in-memory Ewity API"""
+import asyncio
+import math
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Settings are read at import time, so configure them before importing the app
+os.environ.setdefault("EWITY_API_TOKEN", "default-token")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='blvq-tests-')}/test.db")
+os.environ.setdefault("SYNC_PAGE_RETRIES", "0")
+os.environ.setdefault("EWITY_TRANSPORT_MODE", "live")
+
+import httpx
+import pytest
+from app.budget import UpstreamBudget
+from app.database import Base, SessionLocal, ensure_schema
+from app.ewity_client import EwityClient
+from app.models import DEFAULT_TENANT
+from app.responses import payload_cache
+
+PAGE_SIZE = 20
+
+
+def make_customer(customer_id: int, name: Optional[str] = None, outstanding: float = 0.0) -> Dict[str, Any]:
+    """An Ewity customer record as returned by GET /customers"""
+    return {
+        "id": customer_id,
+        "name": name or f"Customer {customer_id}",
+        "mobile": f"77{customer_id:05d}",
+        "email": None,
+        "address": None,
+        "credit_limit": 500,
+        "total_outstanding": outstanding,
+        "total_spent": 0.0,
+        "loyalty_text": "No Loyalty",
+        "company_name": None,
+        "loyalty_points": None,
+    }
+
+
+class FakeEwity:
+    """In-memory Ewity /customers endpoint with one customer list per API token"""
+
+    def __init__(self):
+        self.customers: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests: List[Tuple[str, int]] = []  # (token, page)
+        self.failing_pages: Set[int] = set()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        token = request.headers["authorization"].removeprefix("Bearer ")
+        page = int(request.url.params.get("page", 1))
+        self.requests.append((token, page))
+        if page in self.failing_pages:
+            return httpx.Response(503, json={"message": "Service unavailable"})
+
+        rows = self.customers.get(token, [])
+        return httpx.Response(200, json={
+            "pagination": {
+                "total": len(rows),
+                "pageSize": PAGE_SIZE,
+                "current": page,
+                "lastPage": max(math.ceil(len(rows) / PAGE_SIZE), 1),
+            },
+            "data": rows[(page - 1) * PAGE_SIZE: page * PAGE_SIZE],
+        })
+
+    def client(self, tenant_id: str = DEFAULT_TENANT, token: str = "default-token") -> EwityClient:
+        return EwityClient(
+            transport=httpx.MockTransport(self.handler),
+            tenant_id=tenant_id,
+            api_token=token,
+            budget=UpstreamBudget()
+        )
+
+    def pages_requested(self, token: str) -> List[int]:
+        return [page for requested_token, page in self.requests if requested_token == token]
+
+
+def run_sync(client: EwityClient, db, job=None) -> Dict[str, Any]:
+    """Run one customer sync to completion and close the client"""
+    async def run():
+        try:
+            return await client.sync_all_customers_to_db(db, job=job)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def ewity() -> FakeEwity:
+    return FakeEwity()
+
+
+@pytest.fixture
+def db():
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+        payload_cache.clear()
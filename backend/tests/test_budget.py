@@ -0,0 +1,72 @@
+"""Upstream call budget: degrade, exhaust and the sliding minute"""
+import pytest
+from app.budget import UpstreamBudget, UpstreamBudgetExceeded
+from app.config import get_settings
+from conftest import make_customer, run_sync
+
+settings = get_settings()
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ewity_budget_per_minute", 10)
+    monkeypatch.setattr(settings, "ewity_budget_per_day", 1000)
+    monkeypatch.setattr(settings, "ewity_budget_degrade_ratio", 0.8)
+
+
+def test_degrades_then_exhausts(small_budget):
+    budget = UpstreamBudget(clock=Clock(600.0))
+    for _ in range(7):
+        budget.record("GET /api/customer/{uuid}")
+    assert not budget.should_degrade()
+
+    budget.record("startup_sync")
+    assert budget.should_degrade()
+    assert not budget.exhausted()
+
+    budget.record("startup_sync")
+    budget.record("startup_sync")
+    assert budget.exhausted()
+    summary = budget.summary()
+    assert summary["minute"]["by_origin"] == {"GET /api/customer/{uuid}": 7, "startup_sync": 3}
+    assert summary["exhausted"]
+
+
+def test_minute_window_slides_across_the_boundary(small_budget):
+    clock = Clock(600.0 + 50)
+    budget = UpstreamBudget(clock=clock)
+    for _ in range(10):
+        budget.record("sync")
+    assert budget.exhausted()
+
+    # 15s into the next calendar minute, three quarters of the previous one
+    # is still inside the last 60 seconds
+    clock.now += 25
+    assert budget.last_60_seconds()["sync"] == pytest.approx(7.5)
+    for _ in range(3):
+        budget.record("sync")
+    assert budget.exhausted()
+
+    clock.now += 45
+    assert budget.last_60_seconds()["sync"] == 3
+    assert not budget.should_degrade()
+    assert budget.summary()["day"]["total"] == 13
+
+
+def test_exhausted_budget_blocks_sync(small_budget, db, ewity):
+    ewity.customers["default-token"] = [make_customer(1)]
+    client = ewity.client()
+    for _ in range(settings.ewity_budget_per_minute):
+        client.budget.record("other")
+
+    result = run_sync(client, db)
+    assert not result["success"]
+    assert ewity.requests == []
@@ -0,0 +1,24 @@
+"""Customer change log cursor"""
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.models import CustomerChange
+from conftest import make_customer, run_sync
+
+
+def test_cursor_stays_monotonic_after_retention_empties_the_log(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10), make_customer(2, outstanding=20)]
+    run_sync(ewity.client(), db)
+    last_cursor = db.query(func.max(CustomerChange.id)).scalar()
+    assert last_cursor is not None
+
+    # Age every entry past retention; the next complete sync prunes them all
+    db.query(CustomerChange).update({"changed_at": datetime.utcnow() - timedelta(days=365)})
+    db.commit()
+    run_sync(ewity.client(), db)
+    assert db.query(CustomerChange).count() == 0
+
+    ewity.customers["default-token"][0]["total_outstanding"] = 15
+    run_sync(ewity.client(), db)
+    change = db.query(CustomerChange).one()
+    assert change.customer_id == 1
+    assert change.id > last_cursor
@@ -0,0 +1,40 @@
+"""Balance endpoint ETag revalidation"""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import DEFAULT_TENANT, CustomerLink
+from app.tenancy import tenant_clients
+from conftest import make_customer
+
+
+@pytest.fixture
+def api(db, ewity, monkeypatch):
+    """App client (without startup jobs) whose default shop talks to the fake Ewity"""
+    monkeypatch.setitem(tenant_clients._clients, DEFAULT_TENANT, ewity.client())
+    return TestClient(app)
+
+
+def test_unchanged_balance_revalidates_with_304(api, db, ewity):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10)]
+    link = CustomerLink(ewity_customer_id=1)
+    db.add(link)
+    db.commit()
+
+    first = api.get(f"/api/customer/{link.uuid}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("private, max-age=")
+
+    revalidated = api.get(f"/api/customer/{link.uuid}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    # Weak comparison, and any entry of a list, is enough
+    candidates = f'"other", {etag.removeprefix("W/")}'
+    assert api.get(f"/api/customer/{link.uuid}", headers={"If-None-Match": candidates}).status_code == 304
+
+    ewity.customers["default-token"][0]["total_outstanding"] = 25
+    changed = api.get(f"/api/customer/{link.uuid}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["total_outstanding"] == 25
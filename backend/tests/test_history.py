@@ -0,0 +1,44 @@
+"""Balance history points and compaction"""
+from datetime import datetime, timedelta
+from app.history import compact_history, customer_series
+from app.models import DEFAULT_TENANT, BalanceHistory
+from conftest import make_customer, run_sync
+
+
+def add_point(db, customer_id, recorded_at, outstanding):
+    db.add(BalanceHistory(
+        tenant_id=DEFAULT_TENANT,
+        customer_id=customer_id,
+        recorded_at=recorded_at,
+        outstanding_cents=round(outstanding * 100),
+    ))
+
+
+def test_sync_records_points_only_on_change(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10.25)]
+    run_sync(ewity.client(), db)
+    run_sync(ewity.client(), db)
+    ewity.customers["default-token"][0]["total_outstanding"] = 4.5
+    run_sync(ewity.client(), db)
+
+    series = customer_series(db, 1)
+    assert [point["outstanding_balance"] for point in series] == [10.25, 4.5]
+
+
+def test_compaction_downsamples_then_expires_old_points(db):
+    now = datetime.utcnow()
+    old_day = (now - timedelta(days=100)).replace(hour=9)
+    for hour, outstanding in ((0, 1), (3, 2), (6, 3)):
+        add_point(db, 1, old_day + timedelta(hours=hour), outstanding)
+    ancient = now - timedelta(days=1000)
+    add_point(db, 2, ancient, 7)
+    add_point(db, 2, ancient + timedelta(days=1), 8)
+    add_point(db, 1, now - timedelta(days=1), 4)
+    add_point(db, 1, now, 5)
+    db.commit()
+
+    assert compact_history(db) == {"downsampled": 2, "expired": 1}
+    # Recent points stay raw; the old day keeps its last point
+    assert [point["outstanding_balance"] for point in customer_series(db, 1)] == [3, 4, 5]
+    # Past retention only the customer's latest point is kept
+    assert [point["outstanding_balance"] for point in customer_series(db, 2)] == [8]
@@ -0,0 +1,85 @@
+"""Rate limiter token buckets and batch request costs"""
+import asyncio
+import json
+from app.config import get_settings
+from app.ratelimit import RateLimitMiddleware, TokenBucket
+
+settings = get_settings()
+
+
+class Downstream:
+    """ASGI app that records the bodies it was given"""
+
+    def __init__(self):
+        self.bodies = []
+
+    async def __call__(self, scope, receive, send):
+        self.bodies.append((await receive())["body"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def call(middleware, path, body=b"", method="POST", peer="203.0.113.7", headers=()):
+    """Send one request through the middleware and return the response status"""
+    scope = {"type": "http", "method": method, "path": path, "client": (peer, 1234), "headers": list(headers)}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+def batch_body(count):
+    return json.dumps({"uuids": [f"link-{i}" for i in range(count)]}).encode()
+
+
+def test_token_bucket_refills_and_caps_large_counts():
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    start = bucket.updated
+    assert bucket.take(start, 3) == 0
+    assert bucket.take(start, 2) == 0.5  # 1 left, needs one more at 2/s
+    assert bucket.take(start + 0.5, 2) == 0
+    # More than the capacity waits for a full bucket instead of never succeeding
+    assert bucket.wait(start + 0.5, 10) == 2.0
+    assert bucket.take(start + 2.5, 10) == 0
+    assert bucket.tokens == 0
+
+
+def test_batch_costs_one_ip_token_per_uuid():
+    downstream = Downstream()
+    middleware = RateLimitMiddleware(downstream)
+    per_batch = 5
+    batches = settings.rate_limit_ip_burst // per_batch
+
+    for _ in range(batches):
+        assert call(middleware, "/api/customer/batch", batch_body(per_batch)) == 200
+    assert call(middleware, "/api/customer/batch", batch_body(per_batch)) == 429
+    # The app still receives the body the middleware read to count UUIDs
+    assert downstream.bodies == [batch_body(per_batch)] * batches
+    # ...and each UUID's own bucket paid one token per batch
+    assert middleware.uuid_buckets._buckets["link-0"].tokens < settings.rate_limit_uuid_burst - batches + 1
+
+
+def test_oversized_batch_body_is_rejected_unread():
+    downstream = Downstream()
+    middleware = RateLimitMiddleware(downstream)
+    body = b" " * (middleware.max_batch_body + 1)
+    assert call(middleware, "/api/customer/batch", body) == 413
+    assert downstream.bodies == []
+    # The IP token was taken before the body was read
+    assert middleware.ip_buckets._buckets["203.0.113.7"].tokens < settings.rate_limit_ip_burst
+
+
+def test_forwarded_ip_only_trusted_from_configured_proxies():
+    middleware = RateLimitMiddleware(Downstream())
+    headers = [(b"x-forwarded-for", b"198.51.100.1, 127.0.0.1")]
+    proxied = {"client": ("127.0.0.1", 1234), "headers": headers}
+    spoofed = {"client": ("203.0.113.7", 1234), "headers": headers}
+    assert middleware._client_ip(proxied) == "198.51.100.1"
+    assert middleware._client_ip(spoofed) == "203.0.113.7"
@@ -0,0 +1,50 @@
+"""Snapshot import into an existing database"""
+import json
+import sqlite3
+from app.database import engine
+from app.models import DEFAULT_TENANT, Customer, CustomerLink
+from app.snapshot import import_snapshot
+from conftest import make_customer, run_sync
+
+
+def test_ndjson_import_updates_rows_in_place(db, ewity, tmp_path):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10), make_customer(2, outstanding=20)]
+    run_sync(ewity.client(), db)
+    link = CustomerLink(ewity_customer_id=1, access_score=3.0)
+    db.add(link)
+    db.commit()
+
+    snapshot = tmp_path / "customers.ndjson"
+    snapshot.write_text(json.dumps({
+        "id": 1, "name": "Renamed", "outstanding_balance": 99, "link_uuid": link.uuid,
+        "link_created_at": "2026-01-02T03:04:05",
+    }) + "\n")
+    result = import_snapshot(str(snapshot))
+    assert (result["kind"], result["customers"], result["links"]) == ("ndjson", 1, 1)
+
+    db.expire_all()
+    assert db.query(Customer).count() == 2
+    assert db.get(Customer, (DEFAULT_TENANT, 1)).outstanding_balance == 99
+    assert db.query(CustomerLink).count() == 1
+    # Local-only link columns are not part of the snapshot and survive
+    assert link.access_score == 3.0
+
+
+def test_sqlite_import_restores_only_its_tenant(db, ewity, tmp_path):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10)]
+    ewity.customers["shopb-token"] = [make_customer(1, outstanding=50)]
+    run_sync(ewity.client(), db)
+    run_sync(ewity.client("shopb", "shopb-token"), db)
+
+    backup = tmp_path / "backup.db"
+    with sqlite3.connect(engine.url.database) as source, sqlite3.connect(backup) as target:
+        source.backup(target)
+
+    db.query(Customer).update({"outstanding_balance": 0})
+    db.commit()
+    result = import_snapshot(str(backup))
+    assert (result["kind"], result["customers"]) == ("sqlite", 1)
+
+    db.expire_all()
+    assert db.get(Customer, (DEFAULT_TENANT, 1)).outstanding_balance == 10
+    assert db.get(Customer, ("shopb", 1)).outstanding_balance == 0
@@ -0,0 +1,45 @@
+"""Mark-and-sweep of customers removed upstream"""
+from datetime import datetime, timedelta
+from app.models import Customer, CustomerLink
+from conftest import PAGE_SIZE, make_customer, run_sync
+
+
+def test_removed_customer_is_tombstoned_and_restored(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1), make_customer(2)]
+    run_sync(ewity.client(), db)
+    link = CustomerLink(ewity_customer_id=2)
+    db.add(link)
+    db.commit()
+
+    ewity.customers["default-token"] = [make_customer(1)]
+    assert run_sync(ewity.client(), db)["removed"] == 1
+    db.expire_all()
+    assert db.get(Customer, (link.tenant_id, 2)).deleted_at is not None
+    assert link.customer_missing_at is not None
+
+    ewity.customers["default-token"] = [make_customer(1), make_customer(2)]
+    run_sync(ewity.client(), db)
+    db.expire_all()
+    assert db.get(Customer, (link.tenant_id, 2)).deleted_at is None
+    assert link.customer_missing_at is None
+
+
+def test_incomplete_sync_does_not_sweep(db, ewity):
+    ewity.customers["default-token"] = [make_customer(customer_id) for customer_id in range(1, 2 * PAGE_SIZE + 1)]
+    run_sync(ewity.client(), db)
+
+    ewity.failing_pages = {2}
+    assert not run_sync(ewity.client(), db)["success"]
+    assert db.query(Customer).filter(Customer.deleted_at.is_not(None)).count() == 0
+
+
+def test_old_tombstones_are_purged(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1), make_customer(2)]
+    run_sync(ewity.client(), db)
+    ewity.customers["default-token"] = [make_customer(1)]
+    run_sync(ewity.client(), db)
+
+    db.query(Customer).filter(Customer.id == 2).update({"deleted_at": datetime.utcnow() - timedelta(days=365)})
+    db.commit()
+    run_sync(ewity.client(), db)
+    assert [row.id for row in db.query(Customer).all()] == [1]
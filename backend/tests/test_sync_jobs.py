@@ -0,0 +1,45 @@
+"""Sync job checkpoints"""
+import asyncio
+from app.models import Customer, SyncJob
+from app.sync_jobs import sync_jobs
+from conftest import PAGE_SIZE, make_customer, run_sync
+
+
+def test_failed_job_resumes_from_next_page(db, ewity):
+    ewity.customers["default-token"] = [make_customer(customer_id) for customer_id in range(1, 3 * PAGE_SIZE + 1)]
+    job = SyncJob(status="running", resource="customers")
+    db.add(job)
+    db.commit()
+
+    ewity.failing_pages = {2}
+    result = run_sync(ewity.client(), db, job=job)
+    assert not result["success"]
+    db.refresh(job)
+    assert job.next_page == 2
+    assert job.total_pages == 3
+    assert db.query(Customer).count() == PAGE_SIZE
+
+    ewity.failing_pages = set()
+    ewity.requests.clear()
+    result = run_sync(ewity.client(), db, job=job)
+    assert result["success"]
+    assert sorted(ewity.pages_requested("default-token")) == [2, 3]
+
+    db.refresh(job)
+    assert job.next_page == 4
+    assert job.new_count == 3 * PAGE_SIZE
+    # Rows from before the failure count as seen by the same run, so nothing is swept
+    assert result["removed"] == 0
+    assert db.query(Customer).filter(Customer.deleted_at.is_(None)).count() == 3 * PAGE_SIZE
+
+
+def test_job_for_unknown_tenant_is_marked_failed(db):
+    job = SyncJob(status="pending", resource="customers", tenant_id="missing")
+    db.add(job)
+    db.commit()
+
+    asyncio.run(sync_jobs._run(job.id))
+    db.refresh(job)
+    assert job.status == "failed"
+    assert "missing" in job.error
+    assert job.finished_at is not None
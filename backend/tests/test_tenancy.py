@@ -0,0 +1,48 @@
+"""Tenants whose Ewity shops use the same customer IDs"""
+from app.models import DEFAULT_TENANT, Customer, CustomerChange
+from conftest import make_customer, run_sync
+
+
+def test_tenants_sharing_customer_ids_keep_separate_rows(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1, "Default one", 10), make_customer(2, "Default two", 20)]
+    ewity.customers["shopb-token"] = [make_customer(1, "Shop B one", 99), make_customer(2, "Shop B two", 5)]
+
+    assert run_sync(ewity.client(), db)["new"] == 2
+    assert run_sync(ewity.client("shopb", "shopb-token"), db)["new"] == 2
+
+    rows = {
+        (row.tenant_id, row.id): (row.name, row.outstanding_balance)
+        for row in db.query(Customer).all()
+    }
+    assert rows == {
+        (DEFAULT_TENANT, 1): ("Default one", 10),
+        (DEFAULT_TENANT, 2): ("Default two", 20),
+        ("shopb", 1): ("Shop B one", 99),
+        ("shopb", 2): ("Shop B two", 5),
+    }
+
+
+def test_sync_only_touches_its_own_tenant(db, ewity):
+    ewity.customers["default-token"] = [make_customer(1, outstanding=10), make_customer(2, outstanding=20)]
+    ewity.customers["shopb-token"] = [make_customer(1, outstanding=99), make_customer(2, outstanding=5)]
+    run_sync(ewity.client(), db)
+    run_sync(ewity.client("shopb", "shopb-token"), db)
+
+    # Shop B changes customer 1's balance and removes customer 2
+    ewity.customers["shopb-token"] = [make_customer(1, outstanding=42)]
+    result = run_sync(ewity.client("shopb", "shopb-token"), db)
+    assert result["changed"] == 1
+    assert result["removed"] == 1
+    db.expire_all()
+
+    default_rows = db.query(Customer).filter(Customer.tenant_id == DEFAULT_TENANT).order_by(Customer.id).all()
+    assert [(row.id, row.outstanding_balance, row.deleted_at) for row in default_rows] == [(1, 10, None), (2, 20, None)]
+    shopb = {row.id: row for row in db.query(Customer).filter(Customer.tenant_id == "shopb")}
+    assert shopb[1].outstanding_balance == 42
+    assert shopb[2].deleted_at is not None
+
+    changed = db.query(CustomerChange).filter(CustomerChange.kind != "new").all()
+    assert {(change.tenant_id, change.customer_id, change.kind) for change in changed} == {
+        ("shopb", 1, "changed"),
+        ("shopb", 2, "removed"),
+    }
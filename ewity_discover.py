@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""Ewity POS API endpoint discovery
+
+Probes base URL x endpoint x auth header combinations concurrently and
+records every result in an append-only NDJSON store, so an interrupted run
+picks up where it stopped. `report` turns the store into machine-readable
+JSON and regenerates EWITY_API_SUMMARY.md.
+
+    python ewity_discover.py probe --token YOUR_TOKEN
+    python ewity_discover.py probe --token YOUR_TOKEN --base-url https://api.ewitypos.com/v1 --auth bearer
+    python ewity_discover.py report --markdown EWITY_API_SUMMARY.md
+
+Probes run `--concurrency` at a time with at most `--rate` requests per
+second to any one host. Connection errors, 429s and 5xx responses are
+retried on the next run; use `--fresh` to start over. After
+`--unreachable-after` connection errors in a row, the rest of a host's
+probes are skipped for this run. The token is read from `--token` or
+EWITY_API_TOKEN and is never written to the store.
+
+Try it against the local stand-in API (from backend/):
+    python -m benchmarks.fake_ewity --port 9001 --require-token test-token
+    python ../ewity_discover.py probe --token test-token --base-url http://127.0.0.1:9001/v1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+BASE_URLS = [
+    "https://api.ewitypos.com",
+    "https://api.ewitypos.com/v1",
+    "https://api.ewitypos.com/api",
+    "https://api.ewitypos.com/api/v1",
+    "https://app.ewitypos.com/api",
+    "https://app.ewitypos.com/api/v1",
+    "https://api.ewity.com",
+    "https://api.ewity.com/v1",
+    "https://app.ewity.com/api",
+    "https://uat.ewitypos.com/api",
+    "https://uat.ewitypos.com/api/v1",
+    "https://uat-api.ewitypos.com",
+    "https://uat-api.ewitypos.com/v1",
+    "https://backend.ewitypos.com",
+    "https://backend.ewitypos.com/api",
+]
+
+# Resource names worth trying, singular and plural ("" is the base URL itself)
+ENDPOINTS = [
+    "", "me", "user", "auth", "auth/user", "profile", "info", "status", "health",
+    "customers", "clients", "users", "employees", "company", "settings",
+    "stores", "branches", "locations", "warehouse", "warehouses",
+    "product", "products", "item", "items", "catalog", "goods", "sku", "skus",
+    "menu", "menu-items", "merchandise", "variations", "attributes", "units",
+    "sale", "sales", "transaction", "transactions", "order", "orders",
+    "bill", "bills", "invoice", "invoices", "receipt", "receipts", "pos-sales", "checkout",
+    "inventory", "inventories", "stock", "stocks", "transfer", "transfers",
+    "adjustment", "adjustments", "count", "counts",
+    "category", "categories", "brand", "brands", "tag", "tags",
+    "report", "reports", "analytic", "analytics", "stat", "stats", "statistics",
+    "summary", "dashboard",
+    "payment", "payments", "payment-methods", "refund", "refunds", "expense", "expenses",
+    "tax", "taxes", "discount", "discounts", "loyalty", "reward", "rewards",
+    "supplier", "suppliers", "vendor", "vendors", "purchase", "purchases",
+    "purchase-order", "purchase-orders", "po", "pos",
+    "session", "sessions", "shift", "shifts", "register", "registers",
+]
+
+AUTH_SCHEMES: Dict[str, Callable[[str], Dict[str, str]]] = {
+    "bearer": lambda token: {"Authorization": f"Bearer {token}"},
+    "token": lambda token: {"Authorization": f"Token {token}"},
+    "x-api-key": lambda token: {"X-API-Key": token},
+    "x-auth-token": lambda token: {"X-Auth-Token": token},
+    "api-key": lambda token: {"api-key": token},
+    "token-header": lambda token: {"token": token},
+}
+
+# Headings for endpoints we know; others are listed by path only
+TITLES = {
+    "": ("API Information", "Get API version and description"),
+    "customers": ("Customer Management", "Retrieve customer data"),
+    "users": ("User Management", "Retrieve user accounts"),
+    "employees": ("Employee Management", "Retrieve employee data"),
+    "locations": ("Location/Store Information", "Retrieve store/location data"),
+    "expenses": ("Expense Management", "Retrieve expense data"),
+    "tags": ("Tag Management", "Retrieve tags"),
+}
+
+MAX_SAMPLE_CHARS = 4000
+
+Probe = Tuple[str, str, str]  # (base URL, endpoint, auth scheme)
+
+
+def probe_url(base_url: str, endpoint: str) -> str:
+    return f"{base_url.rstrip('/')}/{endpoint}" if endpoint else base_url
+
+
+def is_transient(result: Dict[str, Any]) -> bool:
+    """Results worth probing again on the next run"""
+    status = result.get("status")
+    return status is None or status == 429 or status >= 500
+
+
+def describe(body: Any) -> Dict[str, Any]:
+    """Shape of a JSON response: keys, pagination, record fields, search, sample"""
+    if not isinstance(body, dict):
+        return {"shape": type(body).__name__}
+    info: Dict[str, Any] = {"keys": list(body)}
+    data = body.get("data")
+    if isinstance(data, list):
+        info["records"] = len(data)
+        if data and isinstance(data[0], dict):
+            info["fields"] = list(data[0])
+    elif isinstance(data, dict):
+        info["fields"] = list(data)
+    for key in ("pagination", "search"):
+        if key in body:
+            info[key] = body[key]
+
+    # Keep one record so samples stay small
+    sample = dict(body, data=data[:1]) if isinstance(data, list) else body
+    text = json.dumps(sample)
+    info["sample"] = sample if len(text) <= MAX_SAMPLE_CHARS else {"truncated": text[:MAX_SAMPLE_CHARS]}
+    return info
+
+
+class ResultStore:
+    """Append-only NDJSON of probe results; the latest line per probe wins"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[Probe, Dict[str, Any]]:
+        results = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by an interrupted run
+                    results[(result["base_url"], result["endpoint"], result["auth"])] = result
+        return results
+
+    def append(self, result: Dict[str, Any]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+class HostRateLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second if per_second > 0 else 0.0
+        self._next: Dict[str, float] = defaultdict(float)
+
+    async def wait(self, host: str) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next[host])
+        self._next[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def probe_once(client: httpx.AsyncClient, probe: Probe, token: str, limiter: HostRateLimiter,
+                     retries: int = 2) -> Dict[str, Any]:
+    base_url, endpoint, auth = probe
+    url = probe_url(base_url, endpoint)
+    result: Dict[str, Any] = {"base_url": base_url, "endpoint": endpoint, "auth": auth, "status": None}
+    for attempt in range(retries + 1):
+        await limiter.wait(urlsplit(url).netloc)
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, headers=AUTH_SCHEMES[auth](token))
+        except httpx.HTTPError as e:
+            result.update(error=f"{type(e).__name__}: {e}", elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+            break
+        result.update(
+            status=response.status_code,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            content_type=response.headers.get("content-type"),
+            server=response.headers.get("server"),
+        )
+        result.pop("error", None)
+        if response.status_code == 429 and attempt < retries:
+            await asyncio.sleep(min(float(response.headers.get("retry-after", 1) or 1), 30))
+            continue
+        try:
+            result.update(describe(response.json()))
+        except ValueError:
+            result["text"] = response.text[:500]
+        break
+    result["probed_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return result
+
+
+async def discover(probes: List[Probe], token: str, store: ResultStore, concurrency: int = 16,
+                   rate: float = 5.0, timeout: float = 10.0, unreachable_after: int = 3,
+                   transport: Optional[httpx.AsyncBaseTransport] = None) -> Counter:
+    """Run the probes and append each result to the store; returns counts by outcome"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for probe in probes:
+        queue.put_nowait(probe)
+    limiter = HostRateLimiter(rate)
+    failures: Dict[str, int] = defaultdict(int)  # Consecutive connection errors per host
+    counts: Counter = Counter()
+
+    async with httpx.AsyncClient(transport=transport, timeout=timeout, follow_redirects=False) as client:
+        async def worker():
+            while True:
+                try:
+                    probe = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                host = urlsplit(probe_url(probe[0], probe[1])).netloc
+                if failures[host] >= unreachable_after:
+                    counts["skipped"] += 1
+                    continue
+
+                result = await probe_once(client, probe, token, limiter)
+                store.append(result)
+                status = result["status"]
+                failures[host] = failures[host] + 1 if status is None else 0
+                counts[outcome(status)] += 1
+                # Rejected auth schemes and 404s are only counted, to keep the output readable
+                if status is not None and status not in (401, 403, 404):
+                    mark = "✓" if 200 <= status < 300 else "?"
+                    print(f"{mark} {status} {probe_url(probe[0], probe[1]):55} | {probe[2]}")
+
+        await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    return counts
+
+
+def outcome(status: Optional[int]) -> str:
+    if status is None:
+        return "error"
+    if 200 <= status < 300:
+        return "available"
+    if status in (401, 403):
+        return "unauthorized"
+    if status == 404:
+        return "not_found"
+    return "other"
+
+
+def summarise(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Machine-readable discovery summary
+
+    The base URL and auth scheme with the most successful endpoints are
+    taken as the working combination; its endpoints are listed by outcome.
+    """
+    results = list(results)
+    scores: Counter = Counter()
+    for result in results:
+        if outcome(result.get("status")) == "available":
+            scores[(result["base_url"], result["auth"])] += 1
+
+    working = None
+    endpoints: Dict[str, List[Dict[str, Any]]] = {"available": [], "unauthorized": [], "not_found": [], "other": [], "error": []}
+    if scores:
+        (base_url, auth), _ = scores.most_common(1)[0]
+        working = {"base_url": base_url, "auth": auth}
+        for result in results:
+            if result["base_url"] == base_url and result["auth"] == auth:
+                endpoints[outcome(result.get("status"))].append(result)
+        for group in endpoints.values():
+            group.sort(key=lambda result: ENDPOINTS.index(result["endpoint"]) if result["endpoint"] in ENDPOINTS else len(ENDPOINTS))
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "probes": len(results),
+        "outcomes": dict(Counter(outcome(result.get("status")) for result in results)),
+        "working": working,
+        "combinations": [
+            {"base_url": base_url, "auth": auth, "available": count}
+            for (base_url, auth), count in scores.most_common()
+        ],
+        "endpoints": endpoints,
+    }
+
+
+def render_markdown(summary: Dict[str, Any]) -> str:
+    """EWITY_API_SUMMARY.md from a discovery summary"""
+    date = summary["generated_at"][:10]
+    working = summary["working"]
+    lines = ["# Ewity POS API - Complete Endpoint Discovery Report", "", f"**Date:** {date}"]
+    if working is None:
+        lines += ["", f"No endpoint answered successfully ({summary['probes']} probes).", ""]
+        return "\n".join(lines)
+
+    prefix = urlsplit(working["base_url"]).path.rstrip("/")
+    auth_header = ", ".join(f"{name}: {value}" for name, value in AUTH_SCHEMES[working["auth"]]("<token>").items())
+    available = summary["endpoints"]["available"]
+    lines += [
+        f"**Base URL:** {working['base_url']}",
+        f"**Authentication:** `{auth_header}`",
+        "",
+        "---",
+        "",
+        "## Summary",
+        "",
+        f"✓ **Total Accessible Endpoints:** {len(available)}",
+        f"✓ **Probes:** {summary['probes']} ({', '.join(f'{count} {name}' for name, count in sorted(summary['outcomes'].items()))})",
+        "",
+        "---",
+        "",
+        "## Available Endpoints",
+        "",
+    ]
+
+    for number, result in enumerate(available, 1):
+        path = f"{prefix}/{result['endpoint']}".rstrip("/") or "/"
+        title, purpose = TITLES.get(result["endpoint"], (None, None))
+        lines.append(f"### {number}. `{path}`" + (f" - {title}" if title else ""))
+        lines.append("**Method:** GET")
+        if purpose:
+            lines.append(f"**Purpose:** {purpose}")
+        pagination = result.get("pagination")
+        if isinstance(pagination, dict):
+            lines.append(f"**Total Records:** {pagination.get('total')}")
+            lines.append(f"**Pagination:** Yes ({pagination.get('pageSize')} items per page, {pagination.get('lastPage')} total pages)")
+        elif "records" in result:
+            lines.append(f"**Total Records:** {result['records']}")
+        if result.get("fields"):
+            lines += ["", "**Fields Available:**"] + [f"- `{field}`" for field in result["fields"]]
+        if "sample" in result:
+            lines += ["", "**Sample Response:**", "```json", json.dumps(result["sample"], indent=2), "```"]
+        lines += ["", "---", ""]
+
+    for key, heading, note in (
+        ("unauthorized", "## Endpoints Requiring Permissions (401/403)", "These exist but the token may not access them:"),
+        ("not_found", "## Endpoints NOT Available (404)", "The following endpoints were tested but returned 404:"),
+    ):
+        paths = [f"{prefix}/{result['endpoint']}".rstrip("/") or "/" for result in summary["endpoints"][key]]
+        if paths:
+            lines += [heading, "", note] + [f"- `{path}`" for path in paths] + ["", "---", ""]
+
+    error_sample = next((result.get("sample") for result in summary["endpoints"]["not_found"] if "sample" in result), None)
+    servers = sorted({result["server"] for result in available if result.get("server")})
+    lines += ["## Technical Details", ""]
+    if servers:
+        lines.append(f"- **Server:** {', '.join(servers)}")
+    lines.append("- **Response Format:** JSON")
+    if error_sample:
+        lines += ["- **Error Format:**", "  ```json"] + [f"  {line}" for line in json.dumps(error_sample, indent=2).splitlines()] + ["  ```"]
+    lines += [
+        "",
+        "---",
+        "",
+        f"**Generated on:** {date} by `ewity_discover.py report`",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Discover Ewity POS API endpoints")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    probe_parser = commands.add_parser("probe", help="Probe endpoints (resumes from the store)")
+    probe_parser.add_argument("--token", default=os.environ.get("EWITY_API_TOKEN"))
+    probe_parser.add_argument("--base-url", action="append", help="Repeatable; default: all known candidates")
+    probe_parser.add_argument("--endpoint", action="append", help="Repeatable; default: all known resource names")
+    probe_parser.add_argument("--auth", action="append", choices=sorted(AUTH_SCHEMES), help="Repeatable; default: all")
+    probe_parser.add_argument("--concurrency", type=int, default=16)
+    probe_parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second per host")
+    probe_parser.add_argument("--timeout", type=float, default=10.0)
+    probe_parser.add_argument("--unreachable-after", type=int, default=3)
+    probe_parser.add_argument("--store", default="ewity_discovery.ndjson")
+    probe_parser.add_argument("--fresh", action="store_true", help="Ignore earlier results")
+
+    report_parser = commands.add_parser("report", help="Summarise the store as JSON and Markdown")
+    report_parser.add_argument("--store", default="ewity_discovery.ndjson")
+    report_parser.add_argument("--json", default="ewity_discovery.json")
+    report_parser.add_argument("--markdown", help="e.g. EWITY_API_SUMMARY.md")
+
+    args = parser.parse_args()
+    store = ResultStore(args.store)
+
+    if args.command == "probe":
+        if not args.token:
+            parser.error("--token or EWITY_API_TOKEN is required")
+        if args.fresh and os.path.exists(args.store):
+            os.remove(args.store)
+        done = {key for key, result in store.load().items() if not is_transient(result)}
+        probes = [
+            (base_url, endpoint, auth)
+            for base_url in args.base_url or BASE_URLS
+            for auth in args.auth or list(AUTH_SCHEMES)
+            for endpoint in args.endpoint or ENDPOINTS
+            if (base_url, endpoint, auth) not in done
+        ]
+        print(f"{len(probes)} probes to run ({len(done)} already done), store: {args.store}")
+        started = time.perf_counter()
+        counts = asyncio.run(discover(
+            probes, args.token, store, args.concurrency, args.rate, args.timeout, args.unreachable_after
+        ))
+        print(f"\nDone in {time.perf_counter() - started:.1f}s: {dict(counts)}")
+        print(f"Run `python {os.path.basename(__file__)} report` to summarise.")
+        return 0
+
+    summary = summarise(store.load().values())
+    with open(args.json, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Summary written to {args.json}")
+    if args.markdown:
+        with open(args.markdown, "w") as f:
+            f.write(render_markdown(summary))
+        print(f"Report written to {args.markdown}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())